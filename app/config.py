@@ -1,4 +1,6 @@
-from pydantic_settings import BaseSettings
+from dataclasses import FrozenInstanceError, dataclass, fields
+from dotenv import dotenv_values
+import os
 
 """
 Config class for the Halo AI Scribe application.
@@ -7,7 +9,8 @@ This class contains the configuration for the application, including the MongoDB
 Anthropic API key, Deepgram API key, and cipher.
 """
 
-class Settings(BaseSettings):
+@dataclass(frozen=True, slots=True)
+class Settings:
     """
     Settings class for the Halo AI Scribe application.
 
@@ -24,7 +27,103 @@ class Settings(BaseSettings):
     FRONTEND_URL: str
     BACKEND_URL: str
     AZURE_API_KEY: str
-    class Config:
-        env_file = ".env"
 
-settings = Settings()
+def read_env_file(env_file=".env"):
+    """
+    Read the environment file if it exists.
+
+    Args:
+        env_file (str): The path to the environment file.
+    Returns:
+        dict: The key/value pairs from the environment file, or an empty dict if it doesn't exist.
+
+    Note:
+        Parsed with python-dotenv, as pydantic-settings did, so quoting, escapes,
+        multi-line values and ${VAR} interpolation behave the same. Keys without a
+        value are skipped.
+    """
+    return {key: value for key, value in dotenv_values(env_file).items() if value is not None}
+
+def find_setting(values, name):
+    """
+    Look up a setting by name, ignoring case as pydantic-settings did.
+
+    Args:
+        values (Mapping): The environment or environment file values.
+        name (str): The name of the setting.
+    Returns:
+        str: The value of the setting, or None if it isn't set.
+    """
+    value = values.get(name)
+    if value is None:
+        lowered = name.lower()
+        value = next((value for key, value in values.items() if key.lower() == lowered), None)
+    return value
+
+class LazySettings:
+    """
+    Lazily resolved view of the application settings.
+
+    Each setting is read from the process environment, or from the environment file,
+    on first attribute access and cached on the instance, so settings a process never
+    uses are never looked up.
+    """
+    def __init__(self, env_file=".env"):
+        """
+        Initialize the lazy settings.
+
+        Args:
+            env_file (str): The path to the environment file. Defaults to ".env".
+        """
+        object.__setattr__(self, "_env_file", env_file)
+        object.__setattr__(self, "_env_values", None)
+
+    def __getattr__(self, name):
+        """
+        Resolve and cache a setting on first access.
+
+        Args:
+            name (str): The name of the setting.
+        Returns:
+            str: The value of the setting.
+        Raises:
+            AttributeError: If the name is not a known setting.
+            RuntimeError: If the setting is missing from both the environment and the environment file.
+
+        Note:
+            Process environment variables take precedence over the environment file.
+            Names are matched case-insensitively.
+        """
+        if name not in SETTING_NAMES:
+            raise AttributeError(f"Unknown setting: {name}")
+        value = find_setting(os.environ, name)
+        if value is None:
+            if self._env_values is None:
+                object.__setattr__(self, "_env_values", read_env_file(self._env_file))
+            value = find_setting(self._env_values, name)
+        if value is None:
+            raise RuntimeError(f"Missing required setting: {name}")
+        object.__setattr__(self, name, value)
+        return value
+
+    def __setattr__(self, name, value):
+        """
+        Reject assignment so the shared settings can't be changed at runtime.
+
+        Raises:
+            FrozenInstanceError: Always.
+        """
+        raise FrozenInstanceError(f"Cannot assign to setting: {name}")
+
+    def __delattr__(self, name):
+        """
+        Reject deletion so the shared settings can't be changed at runtime.
+
+        Raises:
+            FrozenInstanceError: Always.
+        """
+        raise FrozenInstanceError(f"Cannot delete setting: {name}")
+
+SETTING_NAMES = frozenset(field.name for field in fields(Settings))
+
+settings = LazySettings()
@@ -1,10 +1,17 @@
 from app.config import settings
-from app.services.utils import decrypt, encrypt, hash_password
+from app.services.utils import decrypt, decrypt_many, encrypt, hash_password, hash_email, utcnow
 from bson import ObjectId
-from datetime import datetime, timedelta
-from pymongo import MongoClient
+from cachetools import TTLCache
+from dataclasses import dataclass
+from datetime import timedelta
+from functools import lru_cache, partial
+from pymongo import MongoClient, ReturnDocument, UpdateOne, WriteConcern
+from pymongo.errors import BulkWriteError
 from app.services.logging import logger
-import json
+import hmac
+import orjson
+import os
+import threading
 
 """
 MongoDB Database Handler for the Halo Application.
@@ -23,31 +30,278 @@ All database operations are encapsulated in the database class,
 with proper error handling and logging.
 """
 
+_client = None
+_init_lock = threading.RLock()
+
+def get_client():
+    """
+    Get the shared pooled MongoDB client, creating it on first use.
+
+    Returns:
+        MongoClient: The process-wide MongoDB client.
+    """
+    global _client
+    if _client is None:
+        with _init_lock:
+            if _client is None:
+                _client = MongoClient(
+                    settings.MONGODB_URL,
+                    maxPoolSize=200,
+                    minPoolSize=10,
+                    maxIdleTimeMS=60000,
+                    serverSelectionTimeoutMS=10000,
+                    retryWrites=True,
+                    compressors='zstd,zlib'
+                )
+    return _client
+
+def _reset_after_fork():
+    """
+    Drop the inherited client in a forked child so it opens its own pool.
+    """
+    global _client, _init_lock
+    _client = None
+    _init_lock = threading.RLock()
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+SESSION_WRITE_CONCERN = WriteConcern(w=1, j=False)
+SESSION_CACHE_TTL = 10
+SESSION_CACHE_SIZE = 10000
+_session_cache = TTLCache(maxsize=SESSION_CACHE_SIZE, ttl=SESSION_CACHE_TTL)
+_session_cache_lock = threading.Lock()
+
+_default_template_cache = {'version': None, 'ids': None, 'last_id': ''}
+_default_templates_cache = {'version': None, 'templates': None}
+_default_template_lock = threading.Lock()
+
+TEMPLATE_ENCRYPTED_FIELDS = {
+    'name': 'encrypt_name',
+    'instructions': 'encrypt_instructions',
+    'print': 'encrypt_print',
+    'header': 'encrypt_header',
+    'footer': 'encrypt_footer',
+}
+ADMIN_ENCRYPTED_FIELDS = {
+    'master_note_generation_instructions': 'encrypt_master_note_generation_instructions',
+    'master_template_polish_instructions': 'encrypt_master_template_polish_instructions',
+}
+VISIT_ENCRYPTED_FIELDS = {
+    'name': 'encrypt_name',
+    'additional_context': 'encrypt_additional_context',
+    'transcript': 'encrypt_transcript',
+    'note': 'encrypt_note',
+}
+VISIT_DATE_FIELDS = ('created_at', 'modified_at', 'template_modified_at', 'recording_started_at', 'recording_finished_at')
+VISIT_FIELDS = frozenset((
+    'visit_id', 'user_id', 'status', 'template_id', 'language', 'recording_duration',
+    *VISIT_DATE_FIELDS, *VISIT_ENCRYPTED_FIELDS
+))
+
+EMAIL_HASH_BATCH_SIZE = 500
+
+LEGACY_SUBSCRIPTION_FIELDS = (
+    'subscription_status', 'subscription_plan', 'free_trial_used', 'free_trial_expiration_date',
+    'stripe_customer_id', 'stripe_subscription_id'
+)
+LEGACY_MISCELLANEOUS_FIELDS = ('verification_code', 'verification_expires_at', 'reset_code', 'reset_expires_at')
+LEGACY_USER_FILTER_FIELDS = ('subscription_status',) + LEGACY_MISCELLANEOUS_FIELDS
+LEGACY_SUBSCRIPTION_FILTER = {'subscription_status': {'$exists': True}}
+LEGACY_MISCELLANEOUS_FILTER = {'$or': [{field: {'$exists': True}} for field in LEGACY_MISCELLANEOUS_FIELDS]}
+
+USER_MIGRATION_PIPELINE = [
+    {'$set': {
+        'subscription': {
+            'plan': {'$switch': {
+                'branches': [
+                    {'case': {'$eq': ['$subscription_status', 'ACTIVE']}, 'then': {'$ifNull': ['$subscription_plan', 'MONTHLY']}},
+                    {'case': {'$eq': ['$subscription_status', 'FREE_TRIAL']}, 'then': 'FREE'},
+                    {'case': {'$eq': ['$subscription_status', 'CANCELLED']}, 'then': 'CANCELLED'},
+                ],
+                'default': 'NO_PLAN'
+            }},
+            'free_trial_used': {'$ifNull': ['$free_trial_used', False]},
+            'free_trial_expiration_date': {'$ifNull': ['$free_trial_expiration_date', None]},
+            'stripe_customer_id': {'$ifNull': ['$stripe_customer_id', None]},
+            'stripe_subscription_id': {'$ifNull': ['$stripe_subscription_id', None]}
+        }
+    }},
+    {'$unset': list(LEGACY_SUBSCRIPTION_FIELDS + LEGACY_MISCELLANEOUS_FIELDS)}
+]
+
+@lru_cache(maxsize=128)
+def _projection(fields):
+    """
+    Build the projection for a set of fields, reusing it for repeated field sets.
+
+    Args:
+        fields (tuple): The names of the fields to include.
+
+    Returns:
+        dict: The projection. It is shared between calls and must not be modified.
+    """
+    return {field: 1 for field in fields}
+
+@lru_cache(maxsize=128)
+def _visit_projection(fields):
+    """
+    Build the projection for a set of visit fields, reusing it for repeated field sets.
+
+    Args:
+        fields (tuple): The visit field names requested by the client.
+
+    Returns:
+        dict: The projection, with encrypted fields mapped to their stored names.
+              It is shared between calls and must not be modified.
+
+    Note:
+        Names that aren't visit fields are ignored. _id is always included, so the
+        projection never comes out empty and fetches the whole document.
+    """
+    return _projection(('_id',) + tuple(
+        VISIT_ENCRYPTED_FIELDS.get(field, field) for field in fields if field in VISIT_FIELDS and field != 'visit_id'
+    ))
+
+@dataclass(frozen=True, slots=True)
+class MigrationResult:
+    """
+    Counts reported by a user migration run.
+
+    total_users_found: The number of users matching the legacy user filter.
+    migrated_successfully: The number of users the migration modified.
+    """
+    total_users_found: int
+    migrated_successfully: int
+
+def _collection(name):
+    """
+    Build a property that returns a collection bound to the current process's client.
+
+    Args:
+        name (str): The name of the collection.
+    Returns:
+        property: The collection property.
+    """
+    return property(lambda self: self._collections()[name])
+
 class database:
     """
     Main database class that handles all interactions with MongoDB.
     Provides methods for CRUD operations on users, sessions, templates, and visits.
     """
+    client = property(lambda self: get_client())
+    database = _collection('database')
+    sessions = _collection('sessions')
+    users = _collection('users')
+    templates = _collection('templates')
+    visits = _collection('visits')
+    admins = _collection('admins')
+    auth_codes = _collection('auth_codes')
+    meta = _collection('meta')
+
     def __init__(self):
         """
-        Initialize the database connection and set up collection references.
-        Establishes connection to MongoDB using the URL from settings.
-        Sets up references to various collections used in the application.
-        
-        Raises:
-            Exception: If there's an error connecting to the database.
+        Initialize the database handler without connecting.
+
+        Note:
+            Collections are looked up on the shared pooled client from get_client when
+            first used, so importing the module doesn't build a MongoClient, and a
+            forked worker uses its own client even through an instance created before
+            the fork.
+        """
+        self._bound = None
+
+    def _collections(self):
+        """
+        Get the collection references for the current client, rebinding them if the
+        client changed since they were built.
+
+        Returns:
+            dict: The collections by name, plus the 'database' itself.
+
+        Note:
+            Sessions are written with w=1 and no journal wait, since a lost session only
+            means signing in again.
+        """
+        client = get_client()
+        bound = self._bound
+        if bound is None or bound[0] is not client:
+            mongo_database = client['database']
+            collections = {
+                name: mongo_database[name]
+                for name in ('users', 'templates', 'visits', 'admins', 'auth_codes', 'meta')
+            }
+            collections['sessions'] = mongo_database.get_collection('sessions', write_concern=SESSION_WRITE_CONCERN)
+            collections['database'] = mongo_database
+            bound = (client, collections)
+            self._bound = bound
+        return bound[1]
+
+    def ensure_indexes(self):
+        """
+        Create the indexes used by the application's queries.
+
+        Note:
+            Index creation is idempotent, so this is safe to run on every startup.
+            The sessions and auth_codes expiry indexes are TTL indexes, so MongoDB removes
+            those documents once they expire.
+            The legacy user field indexes are partial, so they only hold users that still
+            need migrating and let each branch of the migration filter use an index.
+            Errors are logged rather than raised so the application can still start.
         """
         try:
-            self.client = MongoClient(settings.MONGODB_URL)
-            self.database = self.client['database']
-            self.sessions = self.database['sessions']
-            self.users = self.database['users']
-            self.templates = self.database['templates']
-            self.visits = self.database['visits']
-            self.admins = self.database['admins']
+            self.users.create_index('email_hash', unique=True, sparse=True)
+            self.admins.create_index('email_hash', unique=True, sparse=True)
+            self.templates.create_index('status', partialFilterExpression={'status': 'DEFAULT'})
+            self.visits.create_index([('user_id', 1), ('created_at', -1)])
+            self.sessions.create_index('expiration_date', expireAfterSeconds=0)
+            self.auth_codes.create_index([('user_id', 1), ('purpose', 1)], unique=True)
+            self.auth_codes.create_index('expires_at', expireAfterSeconds=0)
+            for field in LEGACY_USER_FILTER_FIELDS:
+                self.users.create_index(field, partialFilterExpression={field: {'$exists': True}})
         except Exception as e:
-            logger.error(f"Database initialization error: {str(e)}")
-            raise
+            logger.error(f"ensure_indexes error: {str(e)}")
+
+    def _decrypt_fields(self, document, fields, plaintext=None):
+        """
+        Decrypt the encrypt_<field> values of a document, skipping fields whose plaintext is known.
+
+        Args:
+            document (dict): The encrypted document from the database.
+            fields (list): The names of the fields to decrypt, without the encrypt_ prefix.
+            plaintext (dict, optional): Known plaintext values by field name, such as values
+                                        that were just encrypted and written by the caller.
+
+        Returns:
+            list: The plaintext value of each field, in the order given.
+        """
+        plaintext = plaintext or {}
+        missing = [field for field in fields if field not in plaintext]
+        decrypted = dict(zip(missing, decrypt_many([document.get(f'encrypt_{field}') for field in missing])))
+        return [plaintext[field] if field in plaintext else decrypted[field] for field in fields]
+
+    def _update_fields(self, values, encrypted_fields):
+        """
+        Build the $set fields for an update from the values that were provided.
+
+        Args:
+            values (dict): New values by field name. Fields set to None are left unchanged.
+            encrypted_fields (dict): The stored encrypt_<field> name for each field that is encrypted at rest.
+
+        Returns:
+            tuple: The $set fields, and the plaintext of the encrypted fields being updated.
+        """
+        update_fields = {}
+        plaintext = {}
+        for field, value in values.items():
+            if value is None:
+                continue
+            if field in encrypted_fields:
+                update_fields[encrypted_fields[field]] = encrypt(value)
+                plaintext[field] = value
+            else:
+                update_fields[field] = value
+        return update_fields, plaintext
 
     def decrypt_session(self, session):
         """
@@ -63,12 +317,11 @@ class database:
             Converts ObjectIds to strings and decrypts sensitive fields.
         """
         try:
-            session_copy = session.copy()
-            session_copy['session_id'] = str(session_copy['_id'])
-            session_copy['user_id'] = str(session_copy['user_id'])
-            session_copy['expiration_date'] = str(session_copy['expiration_date'])
-            del session_copy['_id']
-            return session_copy
+            return {
+                'user_id': str(session['user_id']),
+                'expiration_date': str(session['expiration_date']),
+                'session_id': str(session['_id']),
+            }
         except Exception as e:
             logger.error(f"decrypt_session error for session_id {session.get('_id', 'unknown')}: {str(e)}")
             return None
@@ -87,7 +340,7 @@ class database:
             Session expiration is set to 1 minute from creation.
         """
         try:
-            session = {'user_id': user_id, 'expiration_date': datetime.utcnow() + timedelta(days=1)}
+            session = {'user_id': user_id, 'expiration_date': utcnow() + timedelta(days=1)}
             self.sessions.insert_one(session)
             return self.decrypt_session(session)
         except Exception as e:
@@ -105,10 +358,37 @@ class database:
             This method does not return a value, and logs any errors.
         """
         try:
+            with _session_cache_lock:
+                _session_cache.pop(session_id, None)
             self.sessions.delete_one({'_id': ObjectId(session_id)})
         except Exception as e:
             logger.error(f"delete_session error for session_id {session_id}: {str(e)}")
 
+    def _find_session(self, session_id):
+        """
+        Find a session document, using a short-lived in-process cache.
+
+        Args:
+            session_id (str): The ID of the session to find.
+
+        Returns:
+            dict: The session document, or None if not found.
+
+        Note:
+            Sessions are only created and deleted, never updated, so found sessions are
+            cached for SESSION_CACHE_TTL seconds. Missing sessions aren't cached.
+            delete_session evicts the session from this process's cache. Other worker
+            processes may still accept a deleted session until their cached entry expires.
+        """
+        with _session_cache_lock:
+            session = _session_cache.get(session_id)
+        if session is None:
+            session = self.sessions.find_one({'_id': ObjectId(session_id)})
+            if session:
+                with _session_cache_lock:
+                    _session_cache[session_id] = session
+        return session
+
     def get_session(self, session_id):
         """
         Retrieve a session by its ID.
@@ -120,7 +400,7 @@ class database:
             dict: The session document with formatted fields, or None if not found or error occurs.
         """
         try:
-            session = self.sessions.find_one({'_id': ObjectId(session_id)})
+            session = self._find_session(session_id)
             return self.decrypt_session(session)
         except Exception as e:
             logger.error(f"get_session error for session_id {session_id}: {str(e)}")
@@ -135,23 +415,26 @@ class database:
             
         Returns:
             str: The user_id associated with the session if valid, None otherwise.
+
+        Note:
+            Expiration is checked on every call, since the TTL index only removes expired
+            sessions periodically and the session may come from the in-process cache.
         """
         try:
-            session = self.get_session(session_id)
-            if session:
-                if datetime.fromisoformat(session['expiration_date'].replace('Z', '+00:00')) > datetime.utcnow():
-                    return session['user_id']
-            return None
+            session = self._find_session(session_id)
+            return str(session['user_id']) if session and session['expiration_date'] > utcnow() else None
         except Exception as e:
             logger.error(f"is_session_valid error for session_id {session_id}: {str(e)}")
             return None
 
-    def decrypt_user(self, user):
+    def decrypt_user(self, user, plaintext=None):
         """
         Decrypt and format a user document from the database.
         
         Args:
             user (dict): The encrypted user document from the database.
+            plaintext (dict, optional): Known plaintext values by field name, which are used
+                                        instead of decrypting the stored values.
             
         Returns:
             dict: The decrypted user document with formatted fields, or None if error occurs.
@@ -161,36 +444,31 @@ class database:
             Only works with the new database format.
         """
         try:
-            user_copy = user.copy()
-            user_copy['user_id'] = str(user_copy['_id'])
-            user_copy['visit_ids'] = [str(visit_id) for visit_id in user_copy['visit_ids']]
-            user_copy['template_ids'] = [str(template_id) for template_id in user_copy['template_ids']]
-            user_copy['name'] = decrypt(user_copy['encrypt_name'])
-            user_copy['email'] = decrypt(user_copy['encrypt_email'])
-            user_copy['created_at'] = str(user_copy['created_at'])
-            user_copy['modified_at'] = str(user_copy['modified_at'])
-            subscription = user_copy.get('subscription', {})
+            subscription = dict(user.get('subscription') or {})
             if subscription.get('free_trial_expiration_date'):
                 subscription['free_trial_expiration_date'] = str(subscription['free_trial_expiration_date'])
-            user_copy['subscription'] = subscription
-            miscellaneous = user_copy.get('miscellaneous', {})
-            if miscellaneous.get('verification_expires_at'):
-                miscellaneous['verification_expires_at'] = str(miscellaneous['verification_expires_at'])
-            if miscellaneous.get('reset_expires_at'):
-                miscellaneous['reset_expires_at'] = str(miscellaneous['reset_expires_at'])
-            user_copy['miscellaneous'] = miscellaneous
-            if 'emr_integration' in user_copy and user_copy['emr_integration']:
-                emr_integration = user_copy['emr_integration']
-                if 'encrypt_credentials' in emr_integration:
-                    decrypted_credentials = decrypt(emr_integration['encrypt_credentials'])
-                    emr_integration['credentials'] = json.loads(decrypted_credentials) if decrypted_credentials else {}
-                    del emr_integration['encrypt_credentials']
-                user_copy['emr_integration'] = emr_integration
-            del user_copy['_id']
-            del user_copy['encrypt_name']
-            del user_copy['encrypt_email']
-            del user_copy['hash_password']
-            return user_copy
+            name, email = self._decrypt_fields(user, ['name', 'email'], plaintext)
+            emr_integration = user.get('emr_integration', {})
+            if emr_integration and 'encrypt_credentials' in emr_integration:
+                emr_integration = {key: value for key, value in emr_integration.items() if key != 'encrypt_credentials'}
+                decrypted_credentials = decrypt(user['emr_integration']['encrypt_credentials'])
+                emr_integration['credentials'] = orjson.loads(decrypted_credentials) if decrypted_credentials else {}
+            return {
+                'created_at': str(user['created_at']),
+                'modified_at': str(user['modified_at']),
+                'status': user.get('status'),
+                'user_specialty': user.get('user_specialty', ''),
+                'default_template_id': user.get('default_template_id', ''),
+                'default_language': user.get('default_language', 'en'),
+                'template_ids': list(map(str, user['template_ids'])),
+                'visit_ids': list(map(str, user['visit_ids'])),
+                'daily_statistics': user.get('daily_statistics', {}),
+                'emr_integration': emr_integration,
+                'subscription': subscription,
+                'user_id': str(user['_id']),
+                'name': name,
+                'email': email,
+            }
         except Exception as e:
             logger.error(f"decrypt_user error for user_id {user.get('_id', 'unknown')}: {str(e)}")
             return None
@@ -212,21 +490,18 @@ class database:
             Automatically assigns default templates to new users.
         """
         try:
+            now = utcnow()
+            if self._find_by_email(self.users, email):
+                return None
             encrypted_email = encrypt(email)
-            all_users = list(self.users.find())
-            for user in all_users:
-                decrypted_email = decrypt(user['encrypt_email'])
-                if decrypted_email == email:
-                    return None
-            default_templates = list(self.templates.find({'status': 'DEFAULT'}))
-            default_template_ids = [template['_id'] for template in default_templates]
-            default_template_id = str(default_templates[-1]['_id']) if default_templates else ''
+            default_template_ids, default_template_id = self._get_default_template_ids()
             user = {
-                'created_at': datetime.utcnow(),
-                'modified_at': datetime.utcnow(),
+                'created_at': now,
+                'modified_at': now,
                 'status': 'UNVERIFIED' if not custom else 'ACTIVE',
                 'encrypt_name': encrypt(name),
                 'encrypt_email': encrypted_email,
+                'email_hash': hash_email(email),
                 'hash_password': hash_password(password),
                 'user_specialty': '',
                 'default_template_id': default_template_id,
@@ -241,20 +516,57 @@ class database:
                     'free_trial_expiration_date': None,
                     'stripe_customer_id': None,
                     'stripe_subscription_id': None
-                },
-                'miscellaneous': {
-                    'verification_code': None,
-                    'verification_expires_at': None,
-                    'reset_code': None,
-                    'reset_expires_at': None
                 }
             }
             self.users.insert_one(user)
-            return self.decrypt_user(user)
+            return self.decrypt_user(user, {'name': name, 'email': email})
         except Exception as e:
             logger.error(f"create_user error for email {email}: {str(e)}")
             return None
         
+    def _default_templates_version(self):
+        """
+        Get the shared version counter of the default templates.
+
+        Returns:
+            int: The version from the meta collection, or 0 if it has never been bumped.
+        """
+        meta = self.meta.find_one({'_id': 'default_templates'}, {'version': 1})
+        return meta['version'] if meta else 0
+
+    def _get_default_template_ids(self):
+        """
+        Get the IDs of the default templates, using the in-process cache when it is current.
+
+        Returns:
+            tuple: The list of default template ObjectIds and the string ID of the last one,
+                or an empty string if there are no default templates.
+
+        Note:
+            The cache is reused until the version counter in the meta collection changes,
+            so a default template created or deleted by any process is picked up by the
+            next call.
+        """
+        version = self._default_templates_version()
+        with _default_template_lock:
+            if _default_template_cache['version'] == version:
+                return list(_default_template_cache['ids']), _default_template_cache['last_id']
+        ids = [template['_id'] for template in self.templates.find({'status': 'DEFAULT'}, {'_id': 1})]
+        last_id = str(ids[-1]) if ids else ''
+        with _default_template_lock:
+            _default_template_cache.update({'version': version, 'ids': ids, 'last_id': last_id})
+        return list(ids), last_id
+
+    def _default_templates_changed(self):
+        """
+        Record that the default templates changed, so cached copies are reloaded.
+
+        Note:
+            Bumps the shared version counter in the meta collection, which every process
+            checks before reusing its cached default template IDs and list.
+        """
+        self.meta.update_one({'_id': 'default_templates'}, {'$inc': {'version': 1}}, upsert=True)
+
     def update_user(self, user_id, name=None, email=None, password=None, user_specialty=None, default_template_id=None, default_language=None, template_ids=None, visit_ids=None, emr_integration=None):
         """
         Update a user's information in the database.
@@ -270,16 +582,19 @@ class database:
             template_ids (list, optional): List of template IDs associated with the user.
             visit_ids (list, optional): List of visit IDs associated with the user.
             emr_integration (dict, optional): EMR integration configuration with credentials.
+                                              The credentials are stored encrypted as JSON.
             
         Returns:
             dict: The updated user document with decrypted fields, or None if update failed.
         """
         try:
+            user_oid = ObjectId(user_id)
             update_fields = {}
             if name is not None:
                 update_fields['encrypt_name'] = encrypt(name)
             if email is not None:
                 update_fields['encrypt_email'] = encrypt(email)
+                update_fields['email_hash'] = hash_email(email)
             if password is not None:
                 update_fields['hash_password'] = hash_password(password)
             if default_template_id is not None:
@@ -293,12 +608,18 @@ class database:
             if visit_ids is not None:
                 update_fields['visit_ids'] = visit_ids
             if emr_integration is not None:
+                if 'credentials' in emr_integration:
+                    emr_integration = {
+                        **{key: value for key, value in emr_integration.items() if key != 'credentials'},
+                        'encrypt_credentials': encrypt(orjson.dumps(emr_integration['credentials']).decode())
+                    }
                 update_fields['emr_integration'] = emr_integration
             if update_fields:
-                update_fields['modified_at'] = datetime.utcnow()
-                self.users.update_one({'_id': ObjectId(user_id)}, {'$set': update_fields})
-            user = self.users.find_one({'_id': ObjectId(user_id)})
-            return self.decrypt_user(user)
+                update_fields['modified_at'] = utcnow()
+                user = self.users.find_one_and_update({'_id': user_oid}, {'$set': update_fields}, return_document=ReturnDocument.AFTER)
+            else:
+                user = self.users.find_one({'_id': user_oid})
+            return self.decrypt_user(user, {field: value for field, value in (('name', name), ('email', email)) if value is not None})
         except Exception as e:
             logger.error(f"update_user error for user_id {user_id}: {str(e)}")
             return None
@@ -337,6 +658,115 @@ class database:
             logger.error(f"get_user error for user_id {user_id}: {str(e)}")
             return None
     
+    def get_user_fields(self, user_id, fields):
+        """
+        Retrieve selected unencrypted fields of a user without decrypting the document.
+
+        Args:
+            user_id (str): The ID of the user to retrieve.
+            fields (list): The names of the fields to return.
+
+        Returns:
+            dict: The user document limited to the requested fields, or None if not found or error occurs.
+        """
+        try:
+            return self.users.find_one({'_id': ObjectId(user_id)}, _projection(tuple(fields)))
+        except Exception as e:
+            logger.error(f"get_user_fields error for user_id {user_id}: {str(e)}")
+            return None
+
+    def _find_by_email(self, collection, email, legacy_filter=None):
+        """
+        Find the encrypted user or admin document for an email address.
+
+        Args:
+            collection (Collection): The users or admins collection to search.
+            email (str): The email address to search for.
+            legacy_filter (dict, optional): Extra conditions for the fallback scan, so only
+                                            matching legacy documents have their email decrypted.
+
+        Returns:
+            dict: The encrypted document, or None if not found.
+
+        Note:
+            Looks the document up by the indexed email hash. Documents created before the
+            hash existed are matched by decrypting their email once, and their hash is
+            backfilled so later lookups hit the index.
+        """
+        email_hash = hash_email(email)
+        document = collection.find_one({'email_hash': email_hash})
+        if document:
+            return document
+        for document in collection.find({'email_hash': {'$exists': False}, **(legacy_filter or {})}, {'encrypt_email': 1}).batch_size(500):
+            if decrypt(document['encrypt_email']) == email:
+                return collection.find_one_and_update({'_id': document['_id']}, {'$set': {'email_hash': email_hash}}, return_document=ReturnDocument.AFTER)
+        return None
+
+    def _write_email_hashes(self, collection, documents):
+        """
+        Store the email hash on a batch of documents in one unordered bulk write.
+
+        Args:
+            collection (Collection): The users or admins collection.
+            documents (list): The documents to update, with _id and encrypt_email.
+
+        Returns:
+            int: The number of documents updated.
+
+        Note:
+            Documents that already have a hash are left alone, so this is safe to run
+            alongside lookups that backfill the hash themselves. Duplicate emails fail on
+            the unique index and are logged.
+        """
+        emails = decrypt_many([document.get('encrypt_email') for document in documents])
+        document_ids = [document['_id'] for document, email in zip(documents, emails) if email]
+        operations = [
+            UpdateOne({'_id': document['_id'], 'email_hash': {'$exists': False}}, {'$set': {'email_hash': hash_email(email)}})
+            for document, email in zip(documents, emails) if email
+        ]
+        if not operations:
+            return 0
+        try:
+            return collection.bulk_write(operations, ordered=False).modified_count
+        except BulkWriteError as e:
+            for error in e.details.get('writeErrors', []):
+                logger.error(f"Email hash backfill error in {collection.name} for _id {document_ids[error['index']]}: {error.get('errmsg')}")
+            return e.details.get('nModified', 0)
+
+    def backfill_email_hashes(self):
+        """
+        Store the email hash on every user and admin created before it existed.
+        This method should be run once after deploying indexed email lookups.
+
+        Returns:
+            dict: The number of users and admins updated.
+
+        Raises:
+            Exception: If the backfill fails. Only documents without a hash are updated, so
+                       it can be rerun.
+
+        Note:
+            Lookups backfill the hash on first match anyway, but until then every miss
+            falls back to scanning and decrypting the documents without one.
+        """
+        try:
+            result = {}
+            for name, collection in (('users', self.users), ('admins', self.admins)):
+                updated = 0
+                batch = []
+                for document in collection.find({'email_hash': {'$exists': False}}, {'encrypt_email': 1}).batch_size(EMAIL_HASH_BATCH_SIZE):
+                    batch.append(document)
+                    if len(batch) >= EMAIL_HASH_BATCH_SIZE:
+                        updated += self._write_email_hashes(collection, batch)
+                        batch = []
+                if batch:
+                    updated += self._write_email_hashes(collection, batch)
+                result[name] = updated
+            return result
+        except Exception as e:
+            logger.error(f"backfill_email_hashes error: {str(e)}")
+            raise
+
     def get_user_by_email(self, email):
         """
         Retrieve a user by their email address.
@@ -348,12 +778,8 @@ class database:
             dict: The user document with decrypted fields, or None if not found or error occurs.
         """
         try:
-            all_users = list(self.users.find())
-            for user in all_users:
-                decrypted_email = decrypt(user['encrypt_email'])
-                if decrypted_email == email:
-                    return self.decrypt_user(user)
-            return None
+            user = self._find_by_email(self.users, email)
+            return self.decrypt_user(user) if user else None
         except Exception as e:
             logger.error(f"get_user_by_email error for email {email}: {str(e)}")
             return None
@@ -371,16 +797,26 @@ class database:
         """
         try:
             hashed_password = hash_password(password)
-            all_users = list(self.users.find())
-            for user in all_users:
-                decrypted_email = decrypt(user['encrypt_email'])
-                if decrypted_email == email and user['hash_password'] == hashed_password:
-                    return self.decrypt_user(user)
-            return None
+            user = self._find_by_email(self.users, email, {'hash_password': hashed_password})
+            if not user or not hmac.compare_digest(user['hash_password'], hashed_password):
+                return None
+            return self.decrypt_user(user)
         except Exception as e:
             logger.error(f"verify_user error for email {email}: {str(e)}")
             return None
     
+    def _owner_ids(self, user_id):
+        """
+        Build the values a visit may store as its owner's user_id.
+
+        Args:
+            user_id (str): The ID of the user.
+
+        Returns:
+            list: The user ID as a string and, when valid, as an ObjectId.
+        """
+        return [user_id, ObjectId(user_id)] if ObjectId.is_valid(user_id) else [user_id]
+
     def get_user_templates(self, user_id):
         """
         Retrieve all templates associated with a user.
@@ -390,17 +826,20 @@ class database:
             
         Returns:
             list: A list of template documents with decrypted fields, or empty list if error occurs.
+
+        Note:
+            Only the user's template_ids are fetched, rather than the whole decrypted user.
         """
         try:
-            user = self.get_user(user_id)
-            template_ids = [ObjectId(tid) for tid in user['template_ids']]
-            templates = list(self.templates.find({'_id': {'$in': template_ids}}))
+            user = self.users.find_one({'_id': ObjectId(user_id)}, {'template_ids': 1})
+            template_ids = [ObjectId(template_id) for template_id in user['template_ids']]
+            templates = self.templates.find({'_id': {'$in': template_ids}}).batch_size(200)
             return [self.decrypt_template(template) for template in templates]
         except Exception as e:
             logger.error(f"get_user_templates error for user_id {user_id}: {str(e)}")
             return []
 
-    def get_user_visits(self, user_id, subset=False, offset=0, limit=20):
+    def get_user_visits(self, user_id, subset=False, offset=0, limit=20, fields=None):
         """
         Retrieve visits associated with a user.
         
@@ -410,38 +849,43 @@ class database:
                                     If False, uses pagination with offset and limit. Defaults to False.
             offset (int, optional): Number of visits to skip for pagination. Defaults to 0.
             limit (int, optional): Maximum number of visits to return. Defaults to 20.
+            fields (list, optional): The visit fields to return. Only these fields are fetched
+                                    and decrypted. Defaults to None, which returns every field.
             
         Returns:
             list: A list of visit documents with decrypted fields, or empty list if error occurs.
         """
         try:
-            user = self.get_user(user_id)
-            visit_ids = [ObjectId(vid) for vid in user['visit_ids']]
+            owner = {'user_id': {'$in': self._owner_ids(user_id)}}
+            projection = _visit_projection(tuple(fields)) if fields else None
+            decrypt_visit = partial(self._decrypt_visit_partial, fields=fields) if fields else self.decrypt_visit
             
             if subset:
-                today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+                today = utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
                 query = {
-                    '_id': {'$in': visit_ids},
+                    **owner,
                     'created_at': {'$gte': today, '$lt': today + timedelta(days=1)}
                 }
-                today_visits = list(self.visits.find(query).sort('created_at', -1))
+                today_visits = list(self.visits.find(query, projection).sort('created_at', -1))
                 if len(today_visits) >= 10:
-                    return [self.decrypt_visit(visit) for visit in today_visits]
-                return [self.decrypt_visit(visit) for visit in 
-                       self.visits.find({'_id': {'$in': visit_ids}}).sort('created_at', -1).limit(10)]
+                    return [decrypt_visit(visit) for visit in today_visits]
+                return [decrypt_visit(visit) for visit in 
+                       self.visits.find(owner, projection).sort('created_at', -1).limit(10)]
             else:
-                return [self.decrypt_visit(visit) for visit in 
-                       self.visits.find({'_id': {'$in': visit_ids}}).sort('created_at', -1).skip(offset).limit(limit)]
+                return [decrypt_visit(visit) for visit in 
+                       self.visits.find(owner, projection).sort('created_at', -1).skip(offset).limit(limit)]
         except Exception as e:
             logger.error(f"get_user_visits error for user_id {user_id}: {str(e)}")
             return []
 
-    def decrypt_template(self, template):
+    def decrypt_template(self, template, plaintext=None):
         """
         Decrypt and format a template document from the database.
         
         Args:
             template (dict): The encrypted template document from the database.
+            plaintext (dict, optional): Known plaintext values by field name, which are used
+                                        instead of decrypting the stored values.
             
         Returns:
             dict: The decrypted template document with formatted fields, or None if error occurs.
@@ -450,23 +894,20 @@ class database:
             Converts ObjectIds to strings and decrypts sensitive fields.
         """
         try:
-            template_copy = template.copy()
-            template_copy['template_id'] = str(template_copy['_id'])
-            template_copy['user_id'] = str(template_copy['user_id'])
-            template_copy['created_at'] = str(template_copy['created_at'])
-            template_copy['modified_at'] = str(template_copy['modified_at'])
-            template_copy['name'] = decrypt(template_copy['encrypt_name'])
-            template_copy['instructions'] = decrypt(template_copy['encrypt_instructions'])
-            template_copy['print'] = decrypt(template_copy['encrypt_print'])
-            if 'encrypt_header' in template_copy: template_copy['header'] = decrypt(template_copy['encrypt_header'])
-            if 'encrypt_footer' in template_copy: template_copy['footer'] = decrypt(template_copy['encrypt_footer'])
-            del template_copy['_id']
-            del template_copy['encrypt_name']
-            del template_copy['encrypt_instructions']
-            del template_copy['encrypt_print']
-            if 'encrypt_header' in template_copy: del template_copy['encrypt_header']
-            if 'encrypt_footer' in template_copy: del template_copy['encrypt_footer']
-            return template_copy
+            name, instructions, print, header, footer = self._decrypt_fields(template, ['name', 'instructions', 'print', 'header', 'footer'], plaintext)
+            return {
+                'user_id': str(template['user_id']),
+                'created_at': str(template['created_at']),
+                'modified_at': str(template['modified_at']),
+                'status': template.get('status'),
+                'note_generation_quality': template.get('note_generation_quality'),
+                'template_id': str(template['_id']),
+                'name': name,
+                'instructions': instructions,
+                'print': print,
+                'header': header,
+                'footer': footer,
+            }
         except Exception as e:
             logger.error(f"decrypt_template error for template_id {template.get('_id', 'unknown')}: {str(e)}")
             return None
@@ -485,11 +926,11 @@ class database:
             The template is initialized with default values and added to the user's template_ids.
         """
         try:
-            user = self.get_user(user_id)
+            now = utcnow()
             template = {
                 'user_id': user_id,
-                'created_at': datetime.utcnow(),
-                'modified_at': datetime.utcnow(),
+                'created_at': now,
+                'modified_at': now,
                 'status': status,
                 'encrypt_name': encrypt(name),
                 'encrypt_instructions': encrypt(instructions),
@@ -499,8 +940,10 @@ class database:
                 'note_generation_quality': 'BASIC',
             }
             self.templates.insert_one(template)
+            if status == 'DEFAULT':
+                self._default_templates_changed()
             self.users.update_one({'_id': ObjectId(user_id)}, {'$push': {'template_ids': template['_id']}})
-            return self.decrypt_template(template)
+            return self.decrypt_template(template, {'name': name, 'instructions': instructions, 'print': '', 'header': '', 'footer': ''})
         except Exception as e:
             logger.error(f"create_template error for user_id {user_id}: {str(e)}")
             return None
@@ -519,29 +962,44 @@ class database:
             
         Returns:
             dict: The updated template document with decrypted fields, or None if update failed.
+
+        Raises:
+            ValueError: If status is DEFAULT.
+
+        Note:
+            The status of a DEFAULT template is never changed here, and no template can be
+            made DEFAULT here, since default templates are shared by every user. Use the
+            default template methods for those.
         """
+        if status == 'DEFAULT':
+            raise ValueError("update_template can't make a template DEFAULT")
         try:
-            update_fields = {}
-            if status is not None:
-                update_fields['status'] = status
-            if name is not None:
-                update_fields['encrypt_name'] = encrypt(name)
-            if instructions is not None:
-                update_fields['encrypt_instructions'] = encrypt(instructions)
-            if print is not None:
-                update_fields['encrypt_print'] = encrypt(print)  
-            if header is not None:
-                update_fields['encrypt_header'] = encrypt(header)
-            if footer is not None:
-                update_fields['encrypt_footer'] = encrypt(footer)
-            if note_generation_quality is not None:
-                update_fields['note_generation_quality'] = note_generation_quality
+            template_oid = ObjectId(template_id)
+            update_fields, plaintext = self._update_fields({
+                'status': status,
+                'name': name,
+                'instructions': instructions,
+                'print': print,
+                'header': header,
+                'footer': footer,
+                'note_generation_quality': note_generation_quality,
+            }, TEMPLATE_ENCRYPTED_FIELDS)
             if instructions is not None:
-                update_fields['modified_at'] = datetime.utcnow()
+                update_fields['modified_at'] = utcnow()
             if update_fields:
-                self.templates.update_one({'_id': ObjectId(template_id)}, {'$set': update_fields})
-            template = self.templates.find_one({'_id': ObjectId(template_id)})
-            return self.decrypt_template(template)
+                if status is not None:
+                    update = [{'$set': {
+                        **{field: {'$literal': value} for field, value in update_fields.items()},
+                        'status': {'$cond': [{'$eq': ['$status', 'DEFAULT']}, '$status', {'$literal': status}]}
+                    }}]
+                else:
+                    update = {'$set': update_fields}
+                template = self.templates.find_one_and_update({'_id': template_oid}, update, return_document=ReturnDocument.AFTER)
+                if template and template.get('status') == 'DEFAULT':
+                    self._default_templates_changed()
+            else:
+                template = self.templates.find_one({'_id': template_oid})
+            return self.decrypt_template(template, plaintext)
         except Exception as e:
             logger.error(f"update_template error for template_id {template_id}: {str(e)}")
             return None
@@ -559,12 +1017,58 @@ class database:
         """
         try:
             self.templates.delete_one({'_id': ObjectId(template_id)})
-            self.users.update_one({'_id': ObjectId(user_id)}, {'$pull': {'template_ids': ObjectId(template_id)}})
+            self.remove_template_id(user_id, template_id)
             return True
         except Exception as e:
             logger.error(f"delete_template error for template_id {template_id}, user_id {user_id}: {str(e)}")
             return False
 
+    def _update_user_id_list(self, user_id, field, operator, item_id):
+        """
+        Atomically add an ID to, or remove an ID from, one of a user's ID lists.
+
+        Args:
+            user_id (str): The ID of the user to update.
+            field (str): The list field to update, template_ids or visit_ids.
+            operator (str): The update operator, $addToSet or $pull.
+            item_id (str): The ID to add or remove.
+
+        Returns:
+            bool: True if the user was found, False otherwise.
+        """
+        try:
+            result = self.users.update_one({'_id': ObjectId(user_id)}, {operator: {field: ObjectId(item_id)}})
+            return result.matched_count == 1
+        except Exception as e:
+            logger.error(f"{operator} {field} error for user_id {user_id}, id {item_id}: {str(e)}")
+            return False
+
+    def add_template_id(self, user_id, template_id):
+        """
+        Add a template to a user's template list if it isn't already there.
+
+        Args:
+            user_id (str): The ID of the user.
+            template_id (str): The ID of the template to add.
+
+        Returns:
+            bool: True if the user was found, False otherwise.
+        """
+        return self._update_user_id_list(user_id, 'template_ids', '$addToSet', template_id)
+
+    def remove_template_id(self, user_id, template_id):
+        """
+        Remove a template from a user's template list.
+
+        Args:
+            user_id (str): The ID of the user.
+            template_id (str): The ID of the template to remove.
+
+        Returns:
+            bool: True if the user was found, False otherwise.
+        """
+        return self._update_user_id_list(user_id, 'template_ids', '$pull', template_id)
+
     def get_template(self, template_id):
         """
         Retrieve a template by its ID.
@@ -582,12 +1086,14 @@ class database:
             logger.error(f"get_template error for template_id {template_id}: {str(e)}")
             return None
     
-    def decrypt_visit(self, visit):
+    def decrypt_visit(self, visit, plaintext=None):
         """
         Decrypt and format a visit document from the database.
         
         Args:
             visit (dict): The encrypted visit document from the database.
+            plaintext (dict, optional): Known plaintext values by field name, which are used
+                                        instead of decrypting the stored values.
             
         Returns:
             dict: The decrypted visit document with formatted fields, or None if error occurs.
@@ -596,28 +1102,61 @@ class database:
             Converts ObjectIds to strings and decrypts sensitive fields.
         """
         try:
-            visit_copy = visit.copy()
-            visit_copy['visit_id'] = str(visit_copy['_id'])
-            visit_copy['user_id'] = str(visit_copy['user_id'])
-            visit_copy['created_at'] = str(visit_copy['created_at'])
-            visit_copy['modified_at'] = str(visit_copy['modified_at'])
-            if visit_copy['template_modified_at']: visit_copy['template_modified_at'] = str(visit_copy['template_modified_at'])
-            if visit_copy['recording_started_at']: visit_copy['recording_started_at'] = str(visit_copy['recording_started_at'])
-            if visit_copy['recording_finished_at']: visit_copy['recording_finished_at'] = str(visit_copy['recording_finished_at'])
-            visit_copy['name'] = decrypt(visit_copy['encrypt_name'])
-            visit_copy['additional_context'] = decrypt(visit_copy['encrypt_additional_context'])
-            visit_copy['transcript'] = decrypt(visit_copy['encrypt_transcript'])
-            visit_copy['note'] = decrypt(visit_copy['encrypt_note'])
-            del visit_copy['_id']
-            del visit_copy['encrypt_name']
-            del visit_copy['encrypt_additional_context']
-            del visit_copy['encrypt_transcript']
-            del visit_copy['encrypt_note']
-            return visit_copy
+            name, additional_context, transcript, note = self._decrypt_fields(visit, ['name', 'additional_context', 'transcript', 'note'], plaintext)
+            return {
+                'user_id': str(visit['user_id']),
+                'created_at': str(visit['created_at']),
+                'modified_at': str(visit['modified_at']),
+                'status': visit.get('status'),
+                'template_modified_at': str(visit['template_modified_at']) if visit.get('template_modified_at') else visit.get('template_modified_at'),
+                'template_id': visit.get('template_id'),
+                'language': visit.get('language'),
+                'recording_started_at': str(visit['recording_started_at']) if visit.get('recording_started_at') else visit.get('recording_started_at'),
+                'recording_duration': visit.get('recording_duration'),
+                'recording_finished_at': str(visit['recording_finished_at']) if visit.get('recording_finished_at') else visit.get('recording_finished_at'),
+                'visit_id': str(visit['_id']),
+                'name': name,
+                'additional_context': additional_context,
+                'transcript': transcript,
+                'note': note,
+            }
         except Exception as e:
             logger.error(f"decrypt_visit error for visit_id {visit.get('_id', 'unknown')}: {str(e)}")
             return None
     
+    def _decrypt_visit_partial(self, visit, fields, plaintext=None):
+        """
+        Decrypt and format only the requested fields of a visit document.
+
+        Args:
+            visit (dict): The encrypted, possibly projected, visit document from the database.
+            fields (list): The visit fields to return.
+            plaintext (dict, optional): Known plaintext values by field name, which are used
+                                        instead of decrypting the stored ciphertext.
+
+        Returns:
+            dict: The visit_id and the requested fields, or None if error occurs.
+
+        Note:
+            Only the ciphertexts for requested fields are decrypted. Names that aren't
+            visit fields are skipped.
+        """
+        try:
+            result = {'visit_id': str(visit['_id'])}
+            encrypted_fields = [field for field in fields if field in VISIT_ENCRYPTED_FIELDS]
+            result.update(zip(encrypted_fields, self._decrypt_fields(visit, encrypted_fields, plaintext)))
+            for field in fields:
+                if field in result or field not in VISIT_FIELDS:
+                    continue
+                value = visit.get(field)
+                if field == 'user_id' or (field in VISIT_DATE_FIELDS and value):
+                    value = str(value)
+                result[field] = value
+            return result
+        except Exception as e:
+            logger.error(f"_decrypt_visit_partial error for visit_id {visit.get('_id', 'unknown')}: {str(e)}")
+            return None
+
     def create_visit(self, user_id):
         """
         Create a new visit for a user.
@@ -633,14 +1172,15 @@ class database:
             Also updates the user's daily statistics.
         """
         try:
-            user = self.get_user(user_id)
+            now = utcnow()
+            user = self.get_user_fields(user_id, ['default_template_id', 'default_language'])
             visit = {
                 'user_id': user_id,
-                'created_at': datetime.utcnow(),
-                'modified_at': datetime.utcnow(),
+                'created_at': now,
+                'modified_at': now,
                 'status': 'NOT_STARTED',
                 'encrypt_name': encrypt(''),
-                'template_modified_at': datetime.utcnow(),
+                'template_modified_at': now,
                 'template_id': user['default_template_id'],
                 'language': user['default_language'],
                 'encrypt_additional_context': encrypt(''),
@@ -651,14 +1191,16 @@ class database:
                 'encrypt_note': encrypt(''),
             }
             self.visits.insert_one(visit)
-            self.users.update_one({'_id': ObjectId(user_id)}, {'$push': {'visit_ids': visit['_id']}})
-            self.update_daily_statistic(user_id, 'visits', 1)
-            return self.decrypt_visit(visit)
+            self.users.update_one({'_id': ObjectId(user_id)}, {
+                '$push': {'visit_ids': visit['_id']},
+                '$inc': self._daily_statistic_increment('visits', 1, now)
+            })
+            return self.decrypt_visit(visit, {'name': '', 'additional_context': '', 'transcript': '', 'note': ''})
         except Exception as e:
             logger.error(f"create_visit error for user_id {user_id}: {str(e)}")
             return None
     
-    def update_visit(self, visit_id, status=None, name=None, template_modified_at=None, template_id=None, language=None, additional_context=None, recording_started_at=None, recording_duration=None, recording_finished_at=None, transcript=None, note=None):
+    def update_visit(self, visit_id, status=None, name=None, template_modified_at=None, template_id=None, language=None, additional_context=None, recording_started_at=None, recording_duration=None, recording_finished_at=None, transcript=None, note=None, fields=None):
         """
         Update a visit's information in the database.
         
@@ -675,6 +1217,8 @@ class database:
             recording_finished_at (datetime, optional): The timestamp when recording finished.
             transcript (str, optional): The transcript of the visit.
             note (str, optional): Notes for the visit.
+            fields (list, optional): The visit fields to return. Only these fields are fetched
+                                    and decrypted. Defaults to None, which returns every field.
             
         Returns:
             dict: The updated visit document with decrypted fields, or None if update failed.
@@ -683,38 +1227,38 @@ class database:
             Updates the user's daily statistics if recording duration changes.
         """
         try:
-            update_fields = {}
-            if status is not None:
-                update_fields['status'] = status
-            if name is not None:
-                update_fields['encrypt_name'] = encrypt(name)
-            if template_modified_at is not None:
-                update_fields['template_modified_at'] = template_modified_at
-            if template_id is not None:
-                update_fields['template_id'] = template_id
-            if language is not None:
-                update_fields['language'] = language
-            if additional_context is not None:
-                update_fields['encrypt_additional_context'] = encrypt(additional_context)
-            if recording_started_at is not None:
-                update_fields['recording_started_at'] = recording_started_at
-            if recording_finished_at is not None:
-                update_fields['recording_finished_at'] = recording_finished_at
-            if transcript is not None:
-                update_fields['encrypt_transcript'] = encrypt(transcript)
-            if note is not None:
-                update_fields['encrypt_note'] = encrypt(note)
-            if recording_duration is not None:
-                current_visit = self.visits.find_one({'_id': ObjectId(visit_id)})
-                update_fields['recording_duration'] = recording_duration
-                duration_increment = max(0, float(recording_duration or 0) - float(current_visit.get('recording_duration', 0) or 0))
-                if duration_increment > 0:
-                    self.update_daily_statistic(str(current_visit['user_id']), 'audio_time', duration_increment)
-            if update_fields:
-                update_fields['modified_at'] = datetime.utcnow()
-                self.visits.update_one({'_id': ObjectId(visit_id)}, {'$set': update_fields})            
-            visit = self.visits.find_one({'_id': ObjectId(visit_id)})
-            return self.decrypt_visit(visit)
+            visit_oid = ObjectId(visit_id)
+            update_fields, plaintext = self._update_fields({
+                'status': status,
+                'name': name,
+                'template_modified_at': template_modified_at,
+                'template_id': template_id,
+                'language': language,
+                'additional_context': additional_context,
+                'recording_started_at': recording_started_at,
+                'recording_duration': recording_duration,
+                'recording_finished_at': recording_finished_at,
+                'transcript': transcript,
+                'note': note,
+            }, VISIT_ENCRYPTED_FIELDS)
+            projection = _visit_projection(tuple(fields)) if fields is not None else None
+            if not update_fields:
+                visit = self.visits.find_one({'_id': visit_oid}, projection)
+            else:
+                update_fields['modified_at'] = utcnow()
+                if recording_duration is not None:
+                    if projection is not None:
+                        projection = {**projection, 'user_id': 1, 'recording_duration': 1}
+                    previous_visit = self.visits.find_one_and_update({'_id': visit_oid}, {'$set': update_fields}, projection, return_document=ReturnDocument.BEFORE)
+                    visit = {**previous_visit, **update_fields}
+                    duration_increment = max(0, float(recording_duration or 0) - float(previous_visit.get('recording_duration', 0) or 0))
+                    if duration_increment > 0:
+                        self.update_daily_statistic(str(previous_visit['user_id']), 'audio_time', duration_increment)
+                else:
+                    visit = self.visits.find_one_and_update({'_id': visit_oid}, {'$set': update_fields}, projection, return_document=ReturnDocument.AFTER)
+            if fields is not None:
+                return self._decrypt_visit_partial(visit, fields, plaintext)
+            return self.decrypt_visit(visit, plaintext)
         except Exception as e:
             logger.error(f"update_visit error for visit_id {visit_id}: {str(e)}")
             return None
@@ -732,12 +1276,38 @@ class database:
         """
         try:
             self.visits.delete_one({'_id': ObjectId(visit_id)})
-            self.users.update_one({'_id': ObjectId(user_id)}, {'$pull': {'visit_ids': ObjectId(visit_id)}})
+            self.remove_visit_id(user_id, visit_id)
             return True
         except Exception as e:
             logger.error(f"delete_visit error for visit_id {visit_id}, user_id {user_id}: {str(e)}")
             return False
 
+    def add_visit_id(self, user_id, visit_id):
+        """
+        Add a visit to a user's visit list if it isn't already there.
+
+        Args:
+            user_id (str): The ID of the user.
+            visit_id (str): The ID of the visit to add.
+
+        Returns:
+            bool: True if the user was found, False otherwise.
+        """
+        return self._update_user_id_list(user_id, 'visit_ids', '$addToSet', visit_id)
+
+    def remove_visit_id(self, user_id, visit_id):
+        """
+        Remove a visit from a user's visit list.
+
+        Args:
+            user_id (str): The ID of the user.
+            visit_id (str): The ID of the visit to remove.
+
+        Returns:
+            bool: True if the user was found, False otherwise.
+        """
+        return self._update_user_id_list(user_id, 'visit_ids', '$pull', visit_id)
+
     def get_visit(self, visit_id):
         """
         Retrieve a visit by its ID.
@@ -773,10 +1343,11 @@ class database:
             This template is added to all users' template_ids and marked with 'DEFAULT' status.
         """
         try:
+            now = utcnow()
             template = {
                 'user_id': 'HALO',
-                'created_at': datetime.utcnow(),
-                'modified_at': datetime.utcnow(),
+                'created_at': now,
+                'modified_at': now,
                 'status': 'DEFAULT',
                 'encrypt_name': encrypt(name),
                 'encrypt_instructions': encrypt(instructions),
@@ -786,12 +1357,60 @@ class database:
                 'note_generation_quality': 'BASIC',
             }
             self.templates.insert_one(template)
+            self._default_templates_changed()
             self.users.update_many({}, {'$push': {'template_ids': template['_id']}})
-            return self.decrypt_template(template)
+            return self.decrypt_template(template, {'name': name, 'instructions': instructions, 'print': print, 'header': header, 'footer': footer})
         except Exception as e:
             logger.error(f"create_default_template error for name {name}: {str(e)}")
             return None
 
+    def create_default_templates(self, templates):
+        """
+        Create several default templates and add them to all users in one pass.
+        
+        Args:
+            templates (list): Dicts with 'name' and 'instructions', and optionally 'print',
+                              'header' and 'footer', which default to empty strings.
+            
+        Returns:
+            list: The newly created template documents with decrypted fields, or an empty list if creation failed.
+            
+        Note:
+            The templates are inserted with one unordered insert_many, and every user's
+            template_ids is extended with a single $push/$each, rather than one
+            collection-wide update per template.
+        """
+        try:
+            if not templates:
+                return []
+            now = utcnow()
+            plaintexts = [{
+                'name': template['name'],
+                'instructions': template['instructions'],
+                'print': template.get('print', ''),
+                'header': template.get('header', ''),
+                'footer': template.get('footer', ''),
+            } for template in templates]
+            documents = [{
+                'user_id': 'HALO',
+                'created_at': now,
+                'modified_at': now,
+                'status': 'DEFAULT',
+                'encrypt_name': encrypt(plaintext['name']),
+                'encrypt_instructions': encrypt(plaintext['instructions']),
+                'encrypt_print': encrypt(plaintext['print']),
+                'encrypt_header': encrypt(plaintext['header']),
+                'encrypt_footer': encrypt(plaintext['footer']),
+                'note_generation_quality': 'BASIC',
+            } for plaintext in plaintexts]
+            self.templates.insert_many(documents, ordered=False)
+            self._default_templates_changed()
+            self.users.update_many({}, {'$push': {'template_ids': {'$each': [document['_id'] for document in documents]}}})
+            return [self.decrypt_template(document, plaintext) for document, plaintext in zip(documents, plaintexts)]
+        except Exception as e:
+            logger.error(f"create_default_templates error for {len(templates)} templates: {str(e)}")
+            return []
+
     def update_default_template(self, template_id, name=None, instructions=None, print=None, header=None, footer=None, note_generation_quality=None):
         """
         Update a default template.
@@ -808,24 +1427,22 @@ class database:
             dict: The updated template document with decrypted fields, or None if update failed.
         """
         try:
-            update_fields = {}
-            if name is not None:
-                update_fields['encrypt_name'] = encrypt(name)
-            if instructions is not None:
-                update_fields['encrypt_instructions'] = encrypt(instructions)
-            if print is not None:
-                update_fields['encrypt_print'] = encrypt(print)
-            if header is not None:
-                update_fields['encrypt_header'] = encrypt(header)
-            if footer is not None:
-                update_fields['encrypt_footer'] = encrypt(footer)
-            if note_generation_quality is not None:
-                update_fields['note_generation_quality'] = note_generation_quality
+            template_oid = ObjectId(template_id)
+            update_fields, plaintext = self._update_fields({
+                'name': name,
+                'instructions': instructions,
+                'print': print,
+                'header': header,
+                'footer': footer,
+                'note_generation_quality': note_generation_quality,
+            }, TEMPLATE_ENCRYPTED_FIELDS)
             if update_fields:
-                update_fields['modified_at'] = datetime.utcnow()
-                self.templates.update_one({'_id': ObjectId(template_id)}, {'$set': update_fields})
-            template = self.templates.find_one({'_id': ObjectId(template_id)})
-            return self.decrypt_template(template)
+                update_fields['modified_at'] = utcnow()
+                template = self.templates.find_one_and_update({'_id': template_oid}, {'$set': update_fields}, return_document=ReturnDocument.AFTER)
+                self._default_templates_changed()
+            else:
+                template = self.templates.find_one({'_id': template_oid})
+            return self.decrypt_template(template, plaintext)
         except Exception as e:
             logger.error(f"update_default_template error for template_id {template_id}: {str(e)}")
 
@@ -840,13 +1457,41 @@ class database:
             bool: True if deletion was successful, False otherwise.
         """
         try:
-            self.templates.delete_one({'_id': ObjectId(template_id)})
-            self.users.update_many({}, {'$pull': {'template_ids': ObjectId(template_id)}})
+            template_oid = ObjectId(template_id)
+            self.templates.delete_one({'_id': template_oid})
+            self._default_templates_changed()
+            self.users.update_many({}, {'$pull': {'template_ids': template_oid}})
             return True
         except Exception as e:
             logger.error(f"delete_default_template error for template_id {template_id}: {str(e)}")
             return False
 
+    def delete_default_templates(self, template_ids):
+        """
+        Delete several default templates and remove them from all users' template lists.
+        
+        Args:
+            template_ids (list): The IDs of the default templates to delete.
+            
+        Returns:
+            bool: True if deletion was successful, False otherwise.
+            
+        Note:
+            Uses one delete_many and a single $pullAll across users, rather than one
+            collection-wide update per template.
+        """
+        try:
+            template_oids = [ObjectId(template_id) for template_id in template_ids]
+            if not template_oids:
+                return True
+            self.templates.delete_many({'_id': {'$in': template_oids}})
+            self._default_templates_changed()
+            self.users.update_many({}, {'$pullAll': {'template_ids': template_oids}})
+            return True
+        except Exception as e:
+            logger.error(f"delete_default_templates error for template_ids {template_ids}: {str(e)}")
+            return False
+
     def get_default_template(self, template_id):
         """
         Retrieve a default template by its ID.
@@ -870,14 +1515,54 @@ class database:
         
         Returns:
             list: A list of template documents with status 'DEFAULT' and decrypted fields.
+            
+        Note:
+            The decrypted list is cached in process memory and reused until the version
+            counter in the meta collection changes, so a read costs one small lookup.
         """
         try:
-            templates = self.templates.find({'status': 'DEFAULT'})
-            return [self.decrypt_template(template) for template in templates]
+            version = self._default_templates_version()
+            with _default_template_lock:
+                if _default_templates_cache['version'] == version:
+                    return [dict(template) for template in _default_templates_cache['templates']]
+            templates = [self.decrypt_template(template) for template in self.templates.find({'status': 'DEFAULT'}).batch_size(200)]
+            with _default_template_lock:
+                _default_templates_cache['version'] = version
+                _default_templates_cache['templates'] = templates
+            return [dict(template) for template in templates]
         except Exception as e:
             logger.error(f"get_all_default_templates error: {str(e)}")
             return []
 
+    def _daily_statistic_increment(self, stat_type, value, now=None):
+        """
+        Build the $inc document that adds to a user's statistics for today.
+
+        Args:
+            stat_type (str): The type of statistic to update ('visits' or 'audio_time').
+            value: The value to add to the statistic.
+            now (datetime, optional): The caller's current UTC time, so one write uses a single
+                                      timestamp. Defaults to None, which reads the clock.
+
+        Returns:
+            dict: The $inc document for the users collection.
+
+        Note:
+            Both counters are always included, the other one incremented by 0, so $inc
+            creates today's record with both fields the first time it runs.
+        """
+        today = (now or utcnow()).strftime('%Y-%m-%d')
+        visits = 1 if stat_type == 'visits' else 0
+        audio_time = 0
+        if stat_type == 'audio_time':
+            if isinstance(value, str):
+                try:
+                    value = float(value)
+                except ValueError:
+                    value = 0
+            audio_time = value
+        return {f'daily_statistics.{today}.visits': visits, f'daily_statistics.{today}.audio_time': audio_time}
+
     def update_daily_statistic(self, user_id, stat_type, value):
         """
         Update a user's daily statistics.
@@ -893,35 +1578,18 @@ class database:
             For 'audio_time', increments by the provided value.
         """
         try:
-            today = datetime.utcnow().strftime('%Y-%m-%d')
-            self.users.update_one(
-                {'_id': ObjectId(user_id), f'daily_statistics.{today}': {'$exists': False}},
-                {'$set': {f'daily_statistics.{today}': {'visits': 0, 'audio_time': 0}}}
-            )
-            if stat_type == 'visits':
-                self.users.update_one(
-                    {'_id': ObjectId(user_id)},
-                    {'$inc': {f'daily_statistics.{today}.visits': 1}}
-                )
-            elif stat_type == 'audio_time':
-                if isinstance(value, str):
-                    try:
-                        value = float(value)
-                    except ValueError:
-                        value = 0
-                self.users.update_one(
-                    {'_id': ObjectId(user_id)},
-                    {'$inc': {f'daily_statistics.{today}.audio_time': value}}
-                )
+            self.users.update_one({'_id': ObjectId(user_id)}, {'$inc': self._daily_statistic_increment(stat_type, value)})
         except Exception as e:
             logger.error(f"update_daily_statistic error for user_id {user_id}, stat_type {stat_type}, value {value}: {str(e)}")
 
-    def decrypt_admin(self, admin):
+    def decrypt_admin(self, admin, plaintext=None):
         """
         Decrypt and format an admin document from the database.
         
         Args:
             admin (dict): The encrypted admin document from the database.
+            plaintext (dict, optional): Known plaintext values by field name, which are used
+                                        instead of decrypting the stored values.
             
         Returns:
             dict: The decrypted admin document with formatted fields, or None if error occurs.
@@ -930,21 +1598,19 @@ class database:
             Converts ObjectIds to strings and decrypts sensitive fields.
         """
         try:
-            admin_copy = admin.copy()
-            admin_copy['admin_id'] = str(admin_copy['_id'])
-            admin_copy['created_at'] = str(admin_copy['created_at'])
-            admin_copy['modified_at'] = str(admin_copy['modified_at'])
-            admin_copy['name'] = decrypt(admin_copy['encrypt_name'])
-            admin_copy['email'] = decrypt(admin_copy['encrypt_email'])
-            admin_copy['master_note_generation_instructions'] = decrypt(admin_copy['encrypt_master_note_generation_instructions'])
-            admin_copy['master_template_polish_instructions'] = decrypt(admin_copy['encrypt_master_template_polish_instructions'])
-            del admin_copy['_id']
-            del admin_copy['encrypt_name']
-            del admin_copy['encrypt_email']
-            del admin_copy['hashed_password']
-            del admin_copy['encrypt_master_note_generation_instructions']
-            del admin_copy['encrypt_master_template_polish_instructions']
-            return admin_copy
+            name, email, master_note_generation_instructions, master_template_polish_instructions = self._decrypt_fields(
+                admin, ['name', 'email', 'master_note_generation_instructions', 'master_template_polish_instructions'], plaintext
+            )
+            return {
+                'created_at': str(admin['created_at']),
+                'modified_at': str(admin['modified_at']),
+                'status': admin.get('status'),
+                'admin_id': str(admin['_id']),
+                'name': name,
+                'email': email,
+                'master_note_generation_instructions': master_note_generation_instructions,
+                'master_template_polish_instructions': master_template_polish_instructions,
+            }
         except Exception as e:
             logger.error(f"decrypt_admin error for admin_id {admin.get('_id', 'unknown')}: {str(e)}")
             return None
@@ -967,24 +1633,28 @@ class database:
             Checks for existing admins with the same email before creation.
         """
         try:
+            now = utcnow()
+            if self._find_by_email(self.admins, email):
+                return None
             encrypted_email = encrypt(email)
-            all_admins = list(self.admins.find())
-            for admin in all_admins:
-                decrypted_email = decrypt(admin['encrypt_email'])
-                if decrypted_email == email:
-                    return None
             admin = {
-                'created_at': datetime.utcnow(),
-                'modified_at': datetime.utcnow(),
+                'created_at': now,
+                'modified_at': now,
                 'status': 'ADMIN',
                 'encrypt_name': encrypt(name),
                 'encrypt_email': encrypted_email,
+                'email_hash': hash_email(email),
                 'hashed_password': hash_password(password),
                 'encrypt_master_note_generation_instructions': encrypt(master_note_generation_instructions),
                 'encrypt_master_template_polish_instructions': encrypt(master_template_polish_instructions)
             }
             self.admins.insert_one(admin)
-            return self.decrypt_admin(admin)
+            return self.decrypt_admin(admin, {
+                'name': name,
+                'email': email,
+                'master_note_generation_instructions': master_note_generation_instructions,
+                'master_template_polish_instructions': master_template_polish_instructions
+            })
         except Exception as e:
             logger.error(f"create_admin error for email {email}: {str(e)}")
             return None
@@ -1006,16 +1676,17 @@ class database:
             dict: The updated admin document with decrypted fields, or None if update failed.
         """
         try:
-            update_fields = {}
-            if master_note_generation_instructions is not None:
-                update_fields['encrypt_master_note_generation_instructions'] = encrypt(master_note_generation_instructions)
-            if master_template_polish_instructions is not None:
-                update_fields['encrypt_master_template_polish_instructions'] = encrypt(master_template_polish_instructions)
+            admin_oid = ObjectId(admin_id)
+            update_fields, plaintext = self._update_fields({
+                'master_note_generation_instructions': master_note_generation_instructions,
+                'master_template_polish_instructions': master_template_polish_instructions,
+            }, ADMIN_ENCRYPTED_FIELDS)
             if update_fields:
-                update_fields['modified_at'] = datetime.utcnow()
-                self.admins.update_one({'_id': ObjectId(admin_id)}, {'$set': update_fields})
-            admin = self.admins.find_one({'_id': ObjectId(admin_id)})
-            return self.decrypt_admin(admin)
+                update_fields['modified_at'] = utcnow()
+                admin = self.admins.find_one_and_update({'_id': admin_oid}, {'$set': update_fields}, return_document=ReturnDocument.AFTER)
+            else:
+                admin = self.admins.find_one({'_id': admin_oid})
+            return self.decrypt_admin(admin, plaintext)
         except Exception as e:
             logger.error(f"update_admin error for admin_id {admin_id}: {str(e)}")
             return None
@@ -1070,12 +1741,8 @@ class database:
             dict: The admin document with decrypted fields, or None if not found or error occurs.
         """
         try:
-            all_admins = list(self.admins.find())
-            for admin in all_admins:
-                decrypted_email = decrypt(admin['encrypt_email'])
-                if decrypted_email == email:
-                    return self.decrypt_admin(admin)
-            return None
+            admin = self._find_by_email(self.admins, email)
+            return self.decrypt_admin(admin) if admin else None
         except Exception as e:
             logger.error(f"get_admin_by_email error for email {email}: {str(e)}")
             return None
@@ -1093,17 +1760,33 @@ class database:
         """
         try:
             hashed_password = hash_password(password)
-            all_admins = list(self.admins.find())
-            for admin in all_admins:
-                decrypted_email = decrypt(admin['encrypt_email'])
-                if decrypted_email == email and admin['hashed_password'] == hashed_password:
-                    return self.decrypt_admin(admin)
-            return None
+            admin = self._find_by_email(self.admins, email, {'hashed_password': hashed_password})
+            if not admin or not hmac.compare_digest(admin['hashed_password'], hashed_password):
+                return None
+            return self.decrypt_admin(admin)
         except Exception as e:
             logger.error(f"verify_admin error for email {email}: {str(e)}")
             return None
 
 
+    def _set_auth_code(self, user_id, purpose, code):
+        """
+        Store a one-time code for a user, replacing any earlier code for the same purpose.
+
+        Args:
+            user_id (str): The ID of the user.
+            purpose (str): What the code is for ('verification' or 'reset').
+            code (str): The code to store.
+
+        Note:
+            Codes expire after 1 hour and are removed by the auth_codes TTL index.
+        """
+        self.auth_codes.update_one(
+            {'user_id': ObjectId(user_id), 'purpose': purpose},
+            {'$set': {'code': code, 'expires_at': utcnow() + timedelta(hours=1)}},
+            upsert=True
+        )
+
     def set_verification_code(self, user_id, code):
         """
         Set email verification code for a user.
@@ -1116,14 +1799,7 @@ class database:
             bool: True if successful, False otherwise.
         """
         try:
-            expires_at = datetime.utcnow() + timedelta(hours=1)
-            self.users.update_one(
-                {'_id': ObjectId(user_id)},
-                {'$set': {
-                    'miscellaneous.verification_code': code,
-                    'miscellaneous.verification_expires_at': expires_at
-                }}
-            )
+            self._set_auth_code(user_id, 'verification', code)
             return True
         except Exception as e:
             logger.error(f"set_verification_code error for user_id {user_id}: {str(e)}")
@@ -1139,29 +1815,23 @@ class database:
             
         Returns:
             bool: True if verification successful, False otherwise.
+            
+        Note:
+            A matching, unexpired code is consumed so it can't be used twice.
         """
         try:
-            user = self.users.find_one({'_id': ObjectId(user_id)})
-            if not user:
+            now = utcnow()
+            user_oid = ObjectId(user_id)
+            auth_code = self.auth_codes.find_one_and_delete({
+                'user_id': user_oid,
+                'purpose': 'verification',
+                'code': code,
+                'expires_at': {'$gt': now}
+            })
+            if not auth_code:
                 return False
-            
-            miscellaneous = user.get('miscellaneous', {})
-            if miscellaneous.get('verification_code') != code:
-                return False
-            
-            if miscellaneous.get('verification_expires_at') and miscellaneous['verification_expires_at'] < datetime.utcnow():
-                return False
-            
-            self.users.update_one(
-                {'_id': ObjectId(user_id)},
-                {'$set': {
-                    'status': 'ACTIVE',
-                    'miscellaneous.verification_code': None,
-                    'miscellaneous.verification_expires_at': None,
-                    'modified_at': datetime.utcnow()
-                }}
-            )
-            return True
+            result = self.users.update_one({'_id': user_oid}, {'$set': {'status': 'ACTIVE', 'modified_at': now}})
+            return result.matched_count > 0
         except Exception as e:
             logger.error(f"verify_email_code error for user_id {user_id}: {str(e)}")
             return False
@@ -1178,14 +1848,7 @@ class database:
             bool: True if successful, False otherwise.
         """
         try:
-            expires_at = datetime.utcnow() + timedelta(hours=1)
-            self.users.update_one(
-                {'_id': ObjectId(user_id)},
-                {'$set': {
-                    'miscellaneous.reset_code': code,
-                    'miscellaneous.reset_expires_at': expires_at
-                }}
-            )
+            self._set_auth_code(user_id, 'reset', code)
             return True
         except Exception as e:
             logger.error(f"set_reset_code error for user_id {user_id}: {str(e)}")
@@ -1201,22 +1864,22 @@ class database:
             
         Returns:
             str: The user_id if verification successful, None otherwise.
+            
+        Note:
+            The code is left in place so reset_password can run after it, and is
+            removed there.
         """
         try:
-            user = self.get_user_by_email(email)
+            user = self._find_by_email(self.users, email)
             if not user:
                 return None
-                
-            raw_user = self.users.find_one({'_id': ObjectId(user['user_id'])})
-            miscellaneous = raw_user.get('miscellaneous', {})
-            
-            if miscellaneous.get('reset_code') != code:
-                return None
-            
-            if miscellaneous.get('reset_expires_at') and miscellaneous['reset_expires_at'] < datetime.utcnow():
-                return None
-            
-            return user['user_id']
+            auth_code = self.auth_codes.find_one({
+                'user_id': user['_id'],
+                'purpose': 'reset',
+                'code': code,
+                'expires_at': {'$gt': utcnow()}
+            }, {'_id': 1})
+            return str(user['_id']) if auth_code else None
         except Exception as e:
             logger.error(f"verify_reset_code error for email {email}: {str(e)}")
             return None
@@ -1233,15 +1896,15 @@ class database:
             bool: True if successful, False otherwise.
         """
         try:
+            user_oid = ObjectId(user_id)
             self.users.update_one(
-                {'_id': ObjectId(user_id)},
+                {'_id': user_oid},
                 {'$set': {
                     'hash_password': hash_password(new_password),
-                    'miscellaneous.reset_code': None,
-                    'miscellaneous.reset_expires_at': None,
-                    'modified_at': datetime.utcnow()
+                    'modified_at': utcnow()
                 }}
             )
+            self.auth_codes.delete_one({'user_id': user_oid, 'purpose': 'reset'})
             return True
         except Exception as e:
             logger.error(f"reset_password error for user_id {user_id}: {str(e)}")
@@ -1260,17 +1923,14 @@ class database:
             dict: The updated user document with decrypted fields, or None if update failed.
         """
         try:
-            update_fields = {
+            update_fields, _ = self._update_fields({
                 'subscription.plan': plan,
-                'modified_at': datetime.utcnow()
-            }
-            if stripe_customer_id is not None:
-                update_fields['subscription.stripe_customer_id'] = stripe_customer_id
-            if stripe_subscription_id is not None:
-                update_fields['subscription.stripe_subscription_id'] = stripe_subscription_id
+                'subscription.stripe_customer_id': stripe_customer_id,
+                'subscription.stripe_subscription_id': stripe_subscription_id,
+            }, {})
+            update_fields['modified_at'] = utcnow()
             
-            self.users.update_one({'_id': ObjectId(user_id)}, {'$set': update_fields})
-            user = self.users.find_one({'_id': ObjectId(user_id)})
+            user = self.users.find_one_and_update({'_id': ObjectId(user_id)}, {'$set': update_fields}, return_document=ReturnDocument.AFTER)
             return self.decrypt_user(user)
         except Exception as e:
             logger.error(f"update_user_subscription error for user_id {user_id}: {str(e)}")
@@ -1287,15 +1947,17 @@ class database:
             dict: The updated user document with decrypted fields, or None if update failed.
         """
         try:
-            expiration_date = datetime.utcnow() + timedelta(days=7)
-            update_fields = {
-                'subscription.plan': 'FREE',
-                'subscription.free_trial_used': True,
-                'subscription.free_trial_expiration_date': expiration_date,
-                'modified_at': datetime.utcnow()
-            }
-            self.users.update_one({'_id': ObjectId(user_id)}, {'$set': update_fields})
-            user = self.users.find_one({'_id': ObjectId(user_id)})
+            now = utcnow()
+            user = self.users.find_one_and_update(
+                {'_id': ObjectId(user_id)},
+                {'$set': {
+                    'subscription.plan': 'FREE',
+                    'subscription.free_trial_used': True,
+                    'subscription.free_trial_expiration_date': now + timedelta(days=7),
+                    'modified_at': now
+                }},
+                return_document=ReturnDocument.AFTER
+            )
             return self.decrypt_user(user)
         except Exception as e:
             logger.error(f"start_free_trial error for user_id {user_id}: {str(e)}")
@@ -1310,18 +1972,17 @@ class database:
             
         Returns:
             bool: True if trial has expired, False otherwise.
+            
+        Note:
+            The plan and expiry are checked in the query, so nothing is decrypted.
         """
         try:
-            user = self.get_user(user_id)
-            if not user or user.get('subscription', {}).get('plan') != 'FREE':
-                return False
-            
-            expiration_date = user.get('subscription', {}).get('free_trial_expiration_date')
-            if not expiration_date:
-                return False
-            
-            expiration_datetime = datetime.fromisoformat(expiration_date.replace('Z', '+00:00'))
-            return datetime.utcnow() > expiration_datetime
+            user = self.users.find_one({
+                '_id': ObjectId(user_id),
+                'subscription.plan': 'FREE',
+                'subscription.free_trial_expiration_date': {'$lt': utcnow()}
+            }, {'_id': 1})
+            return user is not None
         except Exception as e:
             logger.error(f"check_trial_expired error for user_id {user_id}: {str(e)}")
             return False
@@ -1332,104 +1993,36 @@ class database:
         This method should be run once to update the database structure.
         
         Returns:
-            dict: Migration results with counts of updated users.
+            MigrationResult: The counts of updated users.
+
+        Raises:
+            Exception: If the migration fails. The update is idempotent, so it can be rerun.
+
+        Note:
+            The migration runs server-side, so user documents are never fetched into the
+            application. Only users with a subscription_status get a rebuilt subscription
+            and lose the legacy subscription fields; the legacy verification and reset codes
+            are dropped, as codes now live in auth_codes.
         """
         try:
             logger.info("Starting user migration to new format...")
-            old_format_users = list(self.users.find({
-                '$or': [
-                    {'subscription_status': {'$exists': True}},
-                    {'verification_code': {'$exists': True}},
-                    {'reset_code': {'$exists': True}}
-                ]
-            }))
-
-            migrated_count = 0
-            error_count = 0
-            
-            for user in old_format_users:
-                try:
-                    user_id = user['_id']
-                    update_fields = {}
-                    
-                    if 'subscription_status' in user:
-                        subscription_status = user.get('subscription_status', 'INACTIVE')
-                        if subscription_status == 'ACTIVE':
-                            plan = user.get('subscription_plan', 'MONTHLY')
-                        elif subscription_status == 'FREE_TRIAL':
-                            plan = 'FREE'
-                        elif subscription_status == 'CANCELLED':
-                            plan = 'CANCELLED'
-                        else:
-                            plan = 'NO_PLAN'
-                        
-                        update_fields['subscription'] = {
-                            'plan': plan,
-                            'free_trial_used': user.get('free_trial_used', False),
-                            'free_trial_expiration_date': user.get('free_trial_expiration_date'),
-                            'stripe_customer_id': user.get('stripe_customer_id'),
-                            'stripe_subscription_id': user.get('stripe_subscription_id')
-                        }
-                        
-                        update_fields['$unset'] = {
-                            'subscription_status': '',
-                            'subscription_plan': '',
-                            'free_trial_used': '',
-                            'free_trial_expiration_date': '',
-                            'stripe_customer_id': '',
-                            'stripe_subscription_id': ''
-                        }
-                    
-                    if any(field in user for field in ['verification_code', 'verification_expires_at', 'reset_code', 'reset_expires_at']):
-                        update_fields['miscellaneous'] = {
-                            'verification_code': user.get('verification_code'),
-                            'verification_expires_at': user.get('verification_expires_at'),
-                            'reset_code': user.get('reset_code'),
-                            'reset_expires_at': user.get('reset_expires_at')
-                        }
-                        
-                        if '$unset' not in update_fields:
-                            update_fields['$unset'] = {}
-                        update_fields['$unset'].update({
-                            'verification_code': '',
-                            'verification_expires_at': '',
-                            'reset_code': '',
-                            'reset_expires_at': ''
-                        })
-                    
-                    if update_fields:
-                        unset_fields = update_fields.pop('$unset', {})
-                        
-                        self.users.update_one(
-                            {'_id': user_id},
-                            {'$set': update_fields}
-                        )
-                        
-                        if unset_fields:
-                            self.users.update_one(
-                                {'_id': user_id},
-                                {'$unset': unset_fields}
-                            )
-                        
-                        migrated_count += 1
-                        logger.info(f"Migrated user {user_id}")
-                
-                except Exception as e:
-                    error_count += 1
-                    logger.error(f"Error migrating user {user.get('_id', 'unknown')}: {str(e)}")
-            
-            result = {
-                'total_users_found': len(old_format_users),
-                'migrated_successfully': migrated_count,
-                'errors': error_count
-            }
+            subscription_result = self.users.update_many(LEGACY_SUBSCRIPTION_FILTER, USER_MIGRATION_PIPELINE)
+            miscellaneous_result = self.users.update_many(
+                LEGACY_MISCELLANEOUS_FILTER,
+                {'$unset': {field: '' for field in LEGACY_MISCELLANEOUS_FIELDS}}
+            )
+
+            result = MigrationResult(
+                total_users_found=subscription_result.matched_count + miscellaneous_result.matched_count,
+                migrated_successfully=subscription_result.modified_count + miscellaneous_result.modified_count
+            )
             
-            logger.info(f"Migration completed: {result}")
+            logger.info("Migration completed: %s", result)
             return result
             
         except Exception as e:
             logger.error(f"Migration failed: {str(e)}")
-            return {'error': str(e)}
+            raise
 
 
-db = database()
\ No newline at end of file
+db = database()
@@ -192,7 +192,7 @@ def create_note(username: str, password: str, patient_id: str, payload: Dict) ->
         print(response.json())
         
         if response.status_code == 200:
-            logger.info(f"Progress note created successfully: {response.json()}")
+            logger.info("Progress note created successfully: %s", response.json())
             return True
         logger.error(f"Failed to create progress note: {response.text}")
         return False
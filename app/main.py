@@ -1,8 +1,10 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import PlainTextResponse
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from app.routers import user, audio, admin, chat, integration, visit, stripe
 from app.services.connection import manager
+from app.database.database import db
 import os
 from datetime import datetime
 from pathlib import Path
@@ -17,7 +19,8 @@ startup and shutdown events, and a root endpoint.
 app = FastAPI(
     title="Halo AI Scribe",
     description="Halo AI Scribe backend.",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 app.add_middleware(
@@ -40,7 +43,10 @@ app.add_middleware(
 async def startup_event():
     """
     Startup event for the FastAPI application.
+    Builds the database indexes in the thread pool, so the blocking index creation
+    doesn't hold up the event loop.
     """
+    await run_in_threadpool(db.ensure_indexes)
 
 @app.on_event("shutdown")
 async def shutdown_event():
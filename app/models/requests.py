@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Literal
+from typing import Literal, Optional
 from fastapi import File, UploadFile
 
 """
@@ -126,11 +126,13 @@ class GetVisitsRequest(BaseModel):
         subset (bool): If True, returns initial subset. If False, uses pagination.
         offset (int, optional): Number of visits to skip for pagination.
         limit (int, optional): Maximum number of visits to return.
+        fields (list[str], optional): Visit fields to return. Returns every field if omitted.
     """
     session_id: str
     subset: bool = False
     offset: int = 0
     limit: int = 20
+    fields: Optional[list[Literal["visit_id", "user_id", "created_at", "modified_at", "status", "template_modified_at", "template_id", "language", "recording_started_at", "recording_duration", "recording_finished_at", "name", "additional_context", "transcript", "note"]]] = None
 
 class DeleteAllVisitsForUserRequest(BaseModel):
     """
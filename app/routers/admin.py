@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException
 from app.database.database import db
 from app.models.requests import CreateDefaultTemplateRequest, DeleteDefaultTemplateRequest, GetDefaultTemplateRequest, DeleteAllVisitsForUserRequest, GetUserStatsRequest, AdminSigninRequest, AdminSignupRequest, GetAdminRequest, UpdateAdminRequest, UpdateDefaultTemplateRequest, ConvertToCustomPlanRequest
-from datetime import datetime
+from app.services.utils import utcnow
 from pydantic import BaseModel
 
 """
@@ -37,7 +37,7 @@ def get_user_stats(request: GetUserStatsRequest):
                 else [user['user_id'] for email in request.user_emails 
                       if (user := db.get_user_by_email(email))])
     
-    end_date = request.end_date or datetime.utcnow().strftime('%Y-%m-%d')
+    end_date = request.end_date or utcnow().strftime('%Y-%m-%d')
     start_date = request.start_date or "1970-01-01"
     
     total_visits = total_audio_time = 0
@@ -72,7 +72,7 @@ def get_user_stats(request: GetUserStatsRequest):
     }
 
 @router.post("/signin")
-async def admin_signin(request: AdminSigninRequest):
+def admin_signin(request: AdminSigninRequest):
     """
     Authenticate an admin user.
 
@@ -95,7 +95,7 @@ async def admin_signin(request: AdminSigninRequest):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
 @router.post("/signup")
-async def admin_signup(request: AdminSignupRequest):
+def admin_signup(request: AdminSignupRequest):
     """
     Create a new admin account.
 
@@ -127,7 +127,7 @@ async def admin_signup(request: AdminSignupRequest):
         raise HTTPException(status_code=400, detail="Admin creation failed - email may already exist")
 
 @router.post("/get_admin")
-async def get_admin(request: GetAdminRequest):
+def get_admin(request: GetAdminRequest):
     """
     Retrieve an admin by their ID.
 
@@ -149,7 +149,7 @@ async def get_admin(request: GetAdminRequest):
         raise HTTPException(status_code=404, detail="Admin not found")
 
 @router.post("/update_admin")
-async def update_admin(request: UpdateAdminRequest):
+def update_admin(request: UpdateAdminRequest):
     """
     Update an admin's settings.
 
@@ -177,7 +177,7 @@ async def update_admin(request: UpdateAdminRequest):
         raise HTTPException(status_code=404, detail="Admin update failed - admin may not exist")
         
 @router.post("/create_default_template")
-async def create_default_template(request: CreateDefaultTemplateRequest):
+def create_default_template(request: CreateDefaultTemplateRequest):
     """
     Create a new default template.
 
@@ -194,7 +194,7 @@ async def create_default_template(request: CreateDefaultTemplateRequest):
     return template
 
 @router.post("/update_default_template")
-async def update_default_template(request: UpdateDefaultTemplateRequest):
+def update_default_template(request: UpdateDefaultTemplateRequest):
     """
     Update a default template.
 
@@ -211,7 +211,7 @@ async def update_default_template(request: UpdateDefaultTemplateRequest):
     return template
 
 @router.post("/delete_default_template")
-async def delete_default_template(request: DeleteDefaultTemplateRequest):
+def delete_default_template(request: DeleteDefaultTemplateRequest):
     """
     Delete a default template.
 
@@ -227,7 +227,7 @@ async def delete_default_template(request: DeleteDefaultTemplateRequest):
     return {"message": "Default Template Deleted"}
 
 @router.get("/get_default_template")
-async def get_default_template(request: GetDefaultTemplateRequest):
+def get_default_template(request: GetDefaultTemplateRequest):
     """
     Retrieve a default template by its ID.
 
@@ -243,7 +243,7 @@ async def get_default_template(request: GetDefaultTemplateRequest):
     return template
 
 @router.get("/get_all_default_templates")
-async def get_all_default_templates():
+def get_all_default_templates():
     """
     Retrieve all default templates.
 
@@ -260,7 +260,7 @@ async def get_all_default_templates():
 
     
 @router.post("/migrate_users")
-async def migrate_users():
+def migrate_users():
     """
     Migrate all existing users from old format to new format.
     
@@ -269,10 +269,33 @@ async def migrate_users():
     to the new nested structure.
     
     Returns:
-        dict: Migration results with counts of updated users.
+        MigrationResult: Migration results with counts of updated users.
+
+    Raises:
+        HTTPException: If the migration fails.
+    """
+    try:
+        return db.migrate_users_to_new_format()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/backfill_email_hashes")
+def backfill_email_hashes():
+    """
+    Store the email hash on users and admins created before indexed email lookups.
+
+    This endpoint should be run once after deploying indexed email lookups.
+
+    Returns:
+        dict: The number of users and admins updated.
+
+    Raises:
+        HTTPException: If the backfill fails.
     """
-    result = db.migrate_users_to_new_format()
-    return result
+    try:
+        return db.backfill_email_hashes()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/delete_all_visits_for_user")
 def delete_all_visits_for_user(request: DeleteAllVisitsForUserRequest):
@@ -296,7 +319,7 @@ def delete_all_visits_for_user(request: DeleteAllVisitsForUserRequest):
         raise HTTPException(status_code=401, detail="Invalid user")
 
 @router.post("/convert_to_custom_plan")
-async def convert_to_custom_plan(request: ConvertToCustomPlanRequest):
+def convert_to_custom_plan(request: ConvertToCustomPlanRequest):
     """
     Convert a user to a custom plan.
 
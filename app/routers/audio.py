@@ -6,6 +6,7 @@ import os
 import time
 import certifi
 from datetime import datetime
+from app.services.utils import utcnow
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, UploadFile, File, Form
 from deepgram import DeepgramClient, LiveOptions, LiveTranscriptionEvents, PrerecordedOptions, FileSource, DeepgramClientOptions
 from app.config import settings
@@ -144,7 +145,7 @@ class Transcriber:
             try:
                 self.connection.finish()
             except Exception as e:
-                logger.debug(f"Error finishing connection: {e}")
+                logger.debug("Error finishing connection: %s", e)
             finally:
                 self.connection = None
         if self.client:
@@ -165,7 +166,7 @@ class Transcriber:
             return
         self.reconnecting = True
         self.reconnect_attempts += 1
-        logger.info(f"Attempting to reconnect to Deepgram (attempt {self.reconnect_attempts}/{self.max_reconnect_attempts})")
+        logger.info("Attempting to reconnect to Deepgram (attempt %s/%s)", self.reconnect_attempts, self.max_reconnect_attempts)
         try:
             await asyncio.sleep(self.reconnect_delay)
             self.reconnect_delay = min(self.reconnect_delay * 2, 30)
@@ -203,7 +204,7 @@ class Transcriber:
                 utterance = " ".join(self.is_finals)
                 self.is_finals = []
                 asyncio.run_coroutine_threadsafe(
-                    self._store_transcript(utterance, datetime.utcnow().isoformat()),
+                    self._store_transcript(utterance, utcnow().isoformat()),
                     self.loop
                 )
     
@@ -224,7 +225,7 @@ class Transcriber:
             timestamp_formatted = datetime.fromisoformat(timestamp).strftime("%H:%M:%S")
             new_transcript = f"[{timestamp_formatted}] {transcript_text}"
             if current_transcript: new_transcript = f"{current_transcript}\n{new_transcript}"
-            db.update_visit(self.visit_id, transcript=new_transcript)
+            db.update_visit(self.visit_id, transcript=new_transcript, fields=["modified_at"])
         except Exception as e:
             logger.error(f"Error storing transcript: {str(e)}")
     
@@ -267,7 +268,7 @@ class Transcriber:
             utterance = " ".join(self.is_finals)
             self.is_finals = []
             asyncio.run_coroutine_threadsafe(
-                self._store_transcript(utterance, datetime.utcnow().isoformat()),
+                self._store_transcript(utterance, utcnow().isoformat()),
                 self.loop
             )
     
@@ -345,7 +346,7 @@ class Transcriber:
                 self.keep_alive_task = None
                 
         await self._cleanup_connection()
-        logger.info(f"Disconnected from Deepgram for visit {self.visit_id}")
+        logger.info("Disconnected from Deepgram for visit %s", self.visit_id)
 
 @router.websocket("/ws/{visit_id}")
 async def transcribe(websocket: WebSocket, visit_id: str):
@@ -398,8 +399,8 @@ async def handle_start_recording(websocket_session_id: str, user_id: str, data:
         Broadcasts the updated visit information to maintain client synchronization.
     """
     try:
-        recording_started_at = str(datetime.utcnow())
-        visit = db.update_visit(data["visit_id"], status="RECORDING", recording_started_at=recording_started_at)
+        recording_started_at = str(utcnow())
+        visit = db.update_visit(data["visit_id"], status="RECORDING", recording_started_at=recording_started_at, fields=["modified_at"])
         broadcast_message = {
             "type": "start_recording",
             "data": {
@@ -437,11 +438,11 @@ async def handle_pause_recording(websocket_session_id: str, user_id: str, data:
         old_visit = db.get_visit(data["visit_id"])
         old_duration = int(old_visit["recording_duration"] if old_visit["recording_duration"] else 0)
         if old_visit.get("recording_started_at"):
-            time_diff = int((datetime.utcnow() - datetime.fromisoformat(old_visit["recording_started_at"])).total_seconds())
+            time_diff = int((utcnow() - datetime.fromisoformat(old_visit["recording_started_at"])).total_seconds())
             new_duration = old_duration + time_diff
         else:
             new_duration = old_duration
-        visit = db.update_visit(data["visit_id"], status="PAUSED", recording_duration=str(new_duration))
+        visit = db.update_visit(data["visit_id"], status="PAUSED", recording_duration=str(new_duration), fields=["modified_at", "recording_duration"])
         broadcast_message = {
             "type": "pause_recording",
             "data": {
@@ -476,8 +477,8 @@ async def handle_resume_recording(websocket_session_id: str, user_id: str, data:
         Maintains accumulated recording duration from previous sessions.
     """
     try:
-        recording_started_at = str(datetime.utcnow())
-        visit = db.update_visit(data["visit_id"], status="RECORDING", recording_started_at=recording_started_at)
+        recording_started_at = str(utcnow())
+        visit = db.update_visit(data["visit_id"], status="RECORDING", recording_started_at=recording_started_at, fields=["modified_at"])
         broadcast_message = {
             "type": "resume_recording",
             "data": {
@@ -514,15 +515,15 @@ async def handle_finish_recording(websocket_session_id: str, user_id: str, data:
         Includes complete transcript in the broadcast for immediate access.
     """
     try:
-        recording_finished_at = str(datetime.utcnow())
+        recording_finished_at = str(utcnow())
         old_visit = db.get_visit(data["visit_id"])
         old_duration = int(old_visit.get("recording_duration") or 0)
         if old_visit.get("recording_started_at"):
-            time_diff = int((datetime.utcnow() - datetime.fromisoformat(old_visit["recording_started_at"])).total_seconds())
+            time_diff = int((utcnow() - datetime.fromisoformat(old_visit["recording_started_at"])).total_seconds())
             new_duration = old_duration + time_diff
         else:
             new_duration = old_duration
-        visit = db.update_visit(data["visit_id"], status="FINISHED", recording_finished_at=recording_finished_at, recording_duration=str(new_duration))
+        visit = db.update_visit(data["visit_id"], status="FINISHED", recording_finished_at=recording_finished_at, recording_duration=str(new_duration), fields=["modified_at", "transcript", "recording_duration"])
         broadcast_message = {
             "type": "finish_recording",
             "data": {
@@ -567,11 +568,11 @@ async def process_audio_file(
             new_transcript = response.results.channels[0].alternatives[0].transcript
 
         current_transcript = db.get_visit(visit_id)["transcript"]
-        timestamp_formatted = datetime.utcnow().strftime("%H:%M:%S")            
+        timestamp_formatted = utcnow().strftime("%H:%M:%S")            
         new_transcript = f"[{timestamp_formatted}] {new_transcript}"
         if current_transcript: 
             new_transcript = f"{current_transcript}\n{new_transcript}"
-        db.update_visit(visit_id, transcript=new_transcript)
+        db.update_visit(visit_id, transcript=new_transcript, fields=["modified_at"])
         
         broadcast_message = {
             "type": "update_transcript",
@@ -664,11 +665,11 @@ async def pause_recording(request: PauseRecordingRequest):
         old_visit = db.get_visit(request.visit_id)
         old_duration = int(old_visit["recording_duration"] if old_visit["recording_duration"] else 0)
         if old_visit.get("recording_started_at"):
-            time_diff = int((datetime.utcnow() - datetime.fromisoformat(old_visit["recording_started_at"])).total_seconds())
+            time_diff = int((utcnow() - datetime.fromisoformat(old_visit["recording_started_at"])).total_seconds())
             new_duration = old_duration + time_diff
         else:
             new_duration = old_duration
-        visit = db.update_visit(request.visit_id, status="PAUSED", recording_duration=str(new_duration))
+        visit = db.update_visit(request.visit_id, status="PAUSED", recording_duration=str(new_duration), fields=["modified_at", "recording_duration"])
         broadcast_message = {
             "type": "pause_recording",
             "data": {
@@ -6,7 +6,7 @@ from app.integrations import officeally, advancemd
 from app.services.connection import manager
 import json
 from app.services.anthropic import ask_claude_json
-from datetime import datetime
+from app.services.utils import utcnow
 
 router = APIRouter()
 
@@ -124,7 +124,7 @@ async def create_note(request: CreateNoteEMRIntegrationRequest):
         visit = db.get_visit(request.visit_id)
 
         instructions = (
-            "Today's date and time: " + datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S") + "\n\n"
+            "Today's date and time: " + utcnow().strftime("%Y-%m-%d %H:%M:%S") + "\n\n"
             "Take the existing SOAP note and do NOT edit or shorten any of the words. Move the corresponding parts of the note into the Office Ally JSON schema. "
             "Keep the content and formatting exactly the same—just map the parts. For example, chief complaint content goes into the chief complaint field of the JSON. "
             "IMPORTANT: If there are no procedure codes to submit, DO NOT include the 'procedure_codes' field at all. "
@@ -31,14 +31,14 @@ def create_checkout_session(request: CreateCheckoutSessionRequest):
         HTTPException: If checkout session creation fails.
     """
     try:
-        logger.info(f"Creating checkout session for user: {request.user_id}, plan: {request.plan_type}")
+        logger.info("Creating checkout session for user: %s, plan: %s", request.user_id, request.plan_type)
         
         user = db.get_user(request.user_id)
         if not user:
             logger.error(f"User not found: {request.user_id}")
             raise HTTPException(status_code=404, detail="User not found")
         
-        logger.info(f"User found: {user['email']}")
+        logger.info("User found: %s", user['email'])
         
         if request.plan_type == 'monthly':
             price_id = 'price_1Rj4wsLnOLAQsDbYvZrM7f2K'
@@ -49,7 +49,7 @@ def create_checkout_session(request: CreateCheckoutSessionRequest):
         else:
             raise HTTPException(status_code=400, detail="Invalid plan type. Must be 'monthly' or 'yearly'")
         
-        logger.info(f"Using price ID: {price_id} for plan: {plan_name}")
+        logger.info("Using price ID: %s for plan: %s", price_id, plan_name)
         
         if not user.get('subscription', {}).get('stripe_customer_id'):
             logger.info("Creating new Stripe customer")
@@ -57,7 +57,7 @@ def create_checkout_session(request: CreateCheckoutSessionRequest):
                 email=user['email'],
                 name=user['name']
             )
-            logger.info(f"Created customer: {customer.id}")
+            logger.info("Created customer: %s", customer.id)
             db.update_user_subscription(
                 user_id=request.user_id,
                 plan='NO_PLAN',
@@ -66,7 +66,7 @@ def create_checkout_session(request: CreateCheckoutSessionRequest):
             customer_id = customer.id
         else:
             customer_id = user['subscription']['stripe_customer_id']
-            logger.info(f"Using existing customer: {customer_id}")
+            logger.info("Using existing customer: %s", customer_id)
         
         logger.info("Creating Stripe checkout session")
         checkout_session = stripe.checkout.Session.create(
@@ -82,7 +82,7 @@ def create_checkout_session(request: CreateCheckoutSessionRequest):
             cancel_url=f"{settings.BACKEND_URL}/stripe/cancel?user_id={request.user_id}",
         )
         
-        logger.info(f"Created checkout session: {checkout_session.id}")
+        logger.info("Created checkout session: %s", checkout_session.id)
         return {"checkout_url": checkout_session.url}
         
     except stripe.error.StripeError as e:
@@ -117,7 +117,7 @@ async def success(session_id: str, user_id: str, plan: str):
                 plan=plan,
                 stripe_subscription_id=session.subscription
             )
-            logger.info(f"Subscription activated for user {user_id} with plan {plan}")
+            logger.info("Subscription activated for user %s with plan %s", user_id, plan)
             
             return RedirectResponse(url=f"{settings.FRONTEND_URL}/dashboard?payment=success")
         else:
@@ -138,7 +138,7 @@ async def cancel(user_id: str):
     Returns:
         RedirectResponse: Redirects to payment required page.
     """
-    logger.info(f"Payment cancelled for user {user_id}")
+    logger.info("Payment cancelled for user %s", user_id)
     return RedirectResponse(url=f"{settings.FRONTEND_URL}/payment-required?cancelled=true")
 
 @router.post("/start-free-trial")
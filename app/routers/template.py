@@ -47,7 +47,8 @@ async def handle_update_template(websocket_session_id: str, user_id: str, data:
         data (dict): The data containing fields to update, must include template_id.
         
     Raises:
-        HTTPException: If there's an error during template update.
+        HTTPException: 400 if the update is rejected, such as making a template DEFAULT,
+                       or 500 if there's an error during template update.
         
     Note:
         Only valid fields are extracted from the data for update.
@@ -67,6 +68,8 @@ async def handle_update_template(websocket_session_id: str, user_id: str, data:
         }
         await manager.broadcast(websocket_session_id, user_id, broadcast_message)
      
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error updating template: {e}")
         raise HTTPException(status_code=500, detail=str(e))
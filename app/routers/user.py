@@ -167,7 +167,7 @@ def get_visits(request: GetVisitsRequest):
         Supports pagination when subset is False.
     """
     user_id = require_verified_user(request.session_id)
-    visits = db.get_user_visits(user_id, request.subset, request.offset, request.limit)
+    visits = db.get_user_visits(user_id, request.subset, request.offset, request.limit, request.fields)
     return visits
 
 @router.post("/verify-email")
@@ -4,7 +4,7 @@ from app.services.logging import logger
 from fastapi import HTTPException
 from app.services.prompts import get_instructions
 from app.services.anthropic import ask_claude_stream, ask_claude
-from datetime import datetime
+from app.services.utils import utcnow
 from fastapi import APIRouter
 import asyncio
 import re
@@ -100,7 +100,7 @@ async def handle_update_visit(websocket_session_id: str, user_id: str, data: dic
     try:
         valid_fields = ["name", "status", "template_id", "language", "additional_context", "recording_started_at", "recording_duration", "recording_finished_at", "transcript", "note"]
         update_fields = {k: v for k, v in data.items() if k in valid_fields}
-        visit = db.update_visit(visit_id=data["visit_id"], **update_fields)
+        visit = db.update_visit(visit_id=data["visit_id"], **update_fields, fields=["modified_at", *update_fields])
         broadcast_message = {
             "type": "update_visit",
             "data": {
@@ -169,7 +169,7 @@ async def handle_generate_note(websocket_session_id: str, user_id: str, data: di
         sections = parse_sections(template.get("instructions"))
 
         if (len(visit.get("transcript").split()) + len(visit.get("additional_context").split())) < 10:
-            db.update_visit(visit_id=data["visit_id"], status="FINISHED", note="Insufficient transcript, please record again.")
+            db.update_visit(visit_id=data["visit_id"], status="FINISHED", note="Insufficient transcript, please record again.", fields=["modified_at"])
             await manager.broadcast(websocket_session_id, user_id, {
                 "type": "note_generated",
                 "data": {
@@ -180,7 +180,7 @@ async def handle_generate_note(websocket_session_id: str, user_id: str, data: di
             })
             return
         
-        db.update_visit(visit_id=data["visit_id"], status="GENERATING_NOTE")
+        db.update_visit(visit_id=data["visit_id"], status="GENERATING_NOTE", fields=["modified_at"])
         section_responses = {}
         response_lock = asyncio.Lock()
         
@@ -226,8 +226,8 @@ async def handle_generate_note(websocket_session_id: str, user_id: str, data: di
                     final_note += f"{section_responses[section['name']]}\n\n"
         
         final_note = final_note.strip()
-        template_modified_at = str(datetime.utcnow())
-        db.update_visit(visit_id=data["visit_id"], note=final_note, status="FINISHED", template_modified_at=template_modified_at)
+        template_modified_at = str(utcnow())
+        db.update_visit(visit_id=data["visit_id"], note=final_note, status="FINISHED", template_modified_at=template_modified_at, fields=["modified_at"])
         
         await manager.broadcast(websocket_session_id, user_id, {
             "type": "note_generated",
@@ -331,7 +331,7 @@ async def handle_generate_visit_name(websocket_session_id: str, user_id: str, da
         visit = db.get_visit(data["visit_id"])
         if not visit.get("name") or visit.get("name") == "" or visit.get("name") == "New Visit":
             name = await ask_claude(f"Generate a name for the visit based on the transcript: {visit.get('transcript')} and additional context: {visit.get('additional_context')}. The name should be a single word or phrase that captures the name of the patient that is coming in for the visit. If no patient name can be found in the transcript or additional context, return exactly 'New Visit'.")
-            db.update_visit(data["visit_id"], name=name)
+            db.update_visit(data["visit_id"], name=name, fields=["modified_at"])
             broadcast_message = {
                 "type": "update_visit",
                 "data": {
@@ -4,6 +4,7 @@ from typing import Dict, List, Set
 import asyncio
 from datetime import datetime
 from app.services.logging import logger
+import orjson
 
 """
 WebSocket Connection Manager for the Halo Application.
@@ -73,7 +74,7 @@ class ConnectionManager:
                 user_connections_copy = dict(self.active_connections[user_id])
                 for websocket_session_id, websocket in user_connections_copy.items():
                     if websocket.client_state == WebSocketState.DISCONNECTED:
-                        logger.info(f"Health check: Removing stale connection for user {user_id}, websocket session {websocket_session_id}")
+                        logger.info("Health check: Removing stale connection for user %s, websocket session %s", user_id, websocket_session_id)
                         await self._remove_connection(websocket, websocket_session_id, user_id)
         
     async def connect(self, websocket: WebSocket, websocket_session_id: str, user_id: str):
@@ -97,7 +98,7 @@ class ConnectionManager:
             
         self.active_connections[user_id][websocket_session_id] = websocket
         self.last_activity[user_id][websocket_session_id] = datetime.now()
-        logger.info(f"New connection established for websocket session {websocket_session_id}, user {user_id}")
+        logger.info("New connection established for websocket session %s, user %s", websocket_session_id, user_id)
         
     async def disconnect(self, websocket: WebSocket, websocket_session_id: str, user_id: str):
         """
@@ -155,6 +156,7 @@ class ConnectionManager:
             Updates the last activity timestamp for each connection that receives the message.
             Sets was_requested=True for the websocket session that requested the message.
             Removes connections that fail to receive the message.
+            The message is serialized once per was_requested value rather than once per connection.
         """
         if user_id not in self.active_connections:
             logger.warning(f"No active connections for user {user_id}")
@@ -163,14 +165,17 @@ class ConnectionManager:
         connection_count = 0
         failed_sessions = []
 
+        payloads = {
+            was_requested: orjson.dumps({**message, "was_requested": was_requested}, option=orjson.OPT_NON_STR_KEYS).decode()
+            for was_requested in (False, True)
+        }
+
         connections_copy = dict(self.active_connections[user_id])        
         for websocket_session_id, websocket in connections_copy.items():
             if (user_id in self.active_connections and 
                 websocket_session_id in self.active_connections[user_id]):
                 try:
-                    msg_copy = dict(message)
-                    msg_copy["was_requested"] = (websocket_session_id == requesting_websocket_session_id)
-                    await websocket.send_json(msg_copy)
+                    await websocket.send_text(payloads[websocket_session_id == requesting_websocket_session_id])
                     connection_count += 1
                     if user_id in self.last_activity and websocket_session_id in self.last_activity[user_id]:
                         self.last_activity[user_id][websocket_session_id] = datetime.now()
@@ -179,7 +184,7 @@ class ConnectionManager:
                     failed_sessions.append((websocket_session_id, websocket))
                 
         for websocket_session_id, websocket in failed_sessions:
-            logger.info(f"Removing failed connection for user {user_id}, websocket session {websocket_session_id}")
+            logger.info("Removing failed connection for user %s, websocket session %s", user_id, websocket_session_id)
             await self._remove_connection(websocket, websocket_session_id, user_id)
             
         return connection_count
@@ -58,7 +58,7 @@ If you didn't request this verification, please ignore this email.
                 subject=subject,
                 contents=contents
             )
-            logger.info(f"Verification email sent to {email}")
+            logger.info("Verification email sent to %s", email)
             return True
         except Exception as e:
             logger.error(f"Failed to send verification email to {email}: {str(e)}")
@@ -89,7 +89,7 @@ If you didn't request a password reset, please ignore this email.
                 subject=subject,
                 contents=contents
             )
-            logger.info(f"Password reset email sent to {email}")
+            logger.info("Password reset email sent to %s", email)
             return True
         except Exception as e:
             logger.error(f"Failed to send password reset email to {email}: {str(e)}")
@@ -2,8 +2,14 @@ from cryptography.fernet import Fernet
 from app.config import settings
 import base64
 from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from datetime import datetime, timezone
+from functools import lru_cache
 import hashlib
+import hmac
+import os
 
 """
 Utils Service for the Halo Application.
@@ -12,13 +18,20 @@ This module provides a centralized utils service for the application.
 It includes functionality for encrypting and decrypting data, hashing passwords, and other utility functions.
 """
 
-def get_encryption_key():
+AESGCM_VERSION = 0x81
+AESGCM_NONCE_SIZE = 12
+
+@lru_cache(maxsize=1)
+def _derive_key() -> bytes:
     """
-    Get the encryption key for the application.
-    Args:
-        None
+    Derive the application's master key from the cipher.
+
     Returns:
-        Fernet: The encryption key for the application.
+        bytes: The 32-byte PBKDF2 key.
+
+    Note:
+        The key is derived once per process, since PBKDF2 with 100,000 iterations
+        dominates the cost of each encrypt or decrypt.
     """
     salt = settings.CIPHER.encode()
     kdf = PBKDF2HMAC(
@@ -27,8 +40,88 @@ def get_encryption_key():
         salt=salt,
         iterations=100000,
     )
-    key = base64.urlsafe_b64encode(kdf.derive(settings.CIPHER.encode()))
-    return Fernet(key)
+    return kdf.derive(settings.CIPHER.encode())
+
+@lru_cache(maxsize=1)
+def get_encryption_key():
+    """
+    Get the encryption key for the application.
+    Args:
+        None
+    Returns:
+        Fernet: The encryption key for the application.
+
+    Note:
+        Only used to decrypt values written before the switch to AES-GCM.
+    """
+    return Fernet(base64.urlsafe_b64encode(_derive_key()))
+
+@lru_cache(maxsize=1)
+def get_aesgcm():
+    """
+    Get the AES-GCM cipher for the application.
+
+    Returns:
+        AESGCM: The AES-GCM cipher keyed with a subkey of the master key.
+
+    Note:
+        The subkey is expanded from the master key with HKDF, so the Fernet and AES-GCM
+        formats never share a key.
+    """
+    hkdf = HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=b'halo-aes-gcm')
+    return AESGCM(hkdf.derive(_derive_key()))
+
+DECRYPT_CACHE_SIZE = 10000
+DECRYPT_CACHE_MAX_LENGTH = 4096
+
+@lru_cache(maxsize=DECRYPT_CACHE_SIZE)
+def _decrypt_cached(encrypted_data: str) -> str:
+    """
+    Decrypt a short value, remembering the result by ciphertext.
+
+    Args:
+        encrypted_data (str): The data to decrypt.
+    Returns:
+        str: The decrypted data.
+    """
+    return _decrypt_token(encrypted_data)
+
+def _decrypt_token(encrypted_data: str) -> str:
+    """
+    Decrypt a non-empty AES-GCM or legacy Fernet token.
+
+    Args:
+        encrypted_data (str): The data to decrypt.
+    Returns:
+        str: The decrypted data.
+
+    Note:
+        AES-GCM tokens start with the AESGCM_VERSION byte. Fernet tokens always start
+        with 0x80, so values written before the switch still decrypt.
+    """
+    token = base64.urlsafe_b64decode(encrypted_data)
+    if token[0] != AESGCM_VERSION:
+        return get_encryption_key().decrypt(encrypted_data.encode()).decode()
+    nonce = token[1:1 + AESGCM_NONCE_SIZE]
+    return get_aesgcm().decrypt(nonce, token[1 + AESGCM_NONCE_SIZE:], token[:1]).decode()
+
+def _decrypt_value(encrypted_data: str) -> str:
+    """
+    Decrypt a non-empty value, using the ciphertext cache for short values.
+
+    Args:
+        encrypted_data (str): The data to decrypt.
+    Returns:
+        str: The decrypted data.
+
+    Note:
+        Decryption is deterministic for a given ciphertext, so cached results never go stale.
+        Values longer than DECRYPT_CACHE_MAX_LENGTH, such as transcripts and notes, aren't
+        cached, which keeps the cache's memory bounded to small fields like names and emails.
+    """
+    if len(encrypted_data) > DECRYPT_CACHE_MAX_LENGTH:
+        return _decrypt_token(encrypted_data)
+    return _decrypt_cached(encrypted_data)
 
 def encrypt(data: str) -> str:
     """
@@ -38,12 +131,17 @@ def encrypt(data: str) -> str:
         data (str): The data to encrypt.
     Returns:
         str: The encrypted data.
+
+    Note:
+        The token is the URL-safe base64 of the version byte, a random 96-bit nonce and
+        the AES-GCM ciphertext and tag. The version byte is authenticated as associated data.
     """
     if not data:
         return data
         
-    f = get_encryption_key()
-    return f.encrypt(data.encode()).decode()
+    header = bytes([AESGCM_VERSION])
+    nonce = os.urandom(AESGCM_NONCE_SIZE)
+    return base64.urlsafe_b64encode(header + nonce + get_aesgcm().encrypt(nonce, data.encode(), header)).decode()
 
 def decrypt(encrypted_data: str) -> str:
     """
@@ -57,8 +155,18 @@ def decrypt(encrypted_data: str) -> str:
     if not encrypted_data:
         return encrypted_data
         
-    f = get_encryption_key()
-    return f.decrypt(encrypted_data.encode()).decode() 
+    return _decrypt_value(encrypted_data)
+
+def decrypt_many(encrypted_values: list) -> list:
+    """
+    Decrypt several values for the application.
+
+    Args:
+        encrypted_values (list): The data to decrypt.
+    Returns:
+        list: The decrypted data, in the same order.
+    """
+    return [_decrypt_value(encrypted_data) if encrypted_data else encrypted_data for encrypted_data in encrypted_values]
 
 def hash_password(password: str) -> str:
     """
@@ -69,4 +177,32 @@ def hash_password(password: str) -> str:
     Returns:
         str: The hashed password.
     """
-    return hashlib.sha256(password.encode()).hexdigest()
\ No newline at end of file
+    return hashlib.sha256(password.encode()).hexdigest()
+
+def hash_email(email: str) -> str:
+    """
+    Hash an email address for indexed lookups.
+
+    Args:
+        email (str): The email address to hash.
+    Returns:
+        str: The keyed HMAC-SHA256 digest of the email address.
+
+    Note:
+        The digest is deterministic so it can be indexed, and keyed with the cipher
+        so it can't be reversed by hashing candidate email addresses.
+    """
+    return hmac.new(settings.CIPHER.encode(), email.encode(), hashlib.sha256).hexdigest()
+
+def utcnow() -> datetime:
+    """
+    Get the current UTC time as a naive datetime.
+
+    Returns:
+        datetime: The current UTC time without tzinfo.
+
+    Note:
+        Replaces datetime.utcnow(), which is deprecated since Python 3.12. The result stays
+        naive because stored dates are naive UTC and are compared against naive values.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)